@@ -0,0 +1,137 @@
+import functools
+
+from google.genai import errors, types
+
+from call_function import get_available_functions
+from config import MAX_ITERS, MODEL, WORKING_DIR
+from dispatch import call_functions
+from functions.cache import file_cache
+from functions.changes import session_changes
+from prompts import system_prompt
+from tracing import tracer
+
+
+@functools.cache
+def generate_content_config():
+    """Builds the request config (tool schemas and system prompt) once, on first use."""
+    return types.GenerateContentConfig(
+        tools=[get_available_functions()],  # Functions the model can call
+        system_instruction=system_prompt,  # System-level guidance prompt
+    )
+
+
+def run_agent(
+    client, messages, verbose=False, context=None, working_directory=WORKING_DIR
+):
+    """
+    Runs the agent loop until the model returns a final text response.
+
+    Args:
+        client (genai.Client): The Gemini client.
+        messages (list[types.Content]): The conversation so far; updated in place.
+        verbose (bool): Whether to print detailed logs.
+        context (ContextManager, optional): Keeps the history within its token budget.
+        working_directory (str): The directory the tools operate in.
+
+    Returns:
+        str | None: The final response, or None if MAX_ITERS was reached.
+
+    Raises:
+        errors.APIError: If a model call failed in a way retrying won't fix
+                         (or the scheduler already ran out of retries).
+    """
+    # Files this session writes are tracked apart from any other session's
+    with session_changes():
+        # Control loop to prevent infinite generation cycles
+        for iteration in range(MAX_ITERS):
+            try:
+                # Generate response content from the model
+                with tracer.span("iteration", iteration=iteration):
+                    final_response = generate_content(
+                        client, messages, verbose, context, working_directory
+                    )
+                if final_response:
+                    return final_response
+            except errors.APIError:
+                # Looping again would only spend iterations on the same failure
+                raise
+            except Exception as e:
+                # Catch and print any errors from generate_content
+                print(f"Error in generate_content: {e}")
+    return None
+
+
+def generate_content(
+    client, messages, verbose, context=None, working_directory=WORKING_DIR
+):
+    # Compact stale tool results if the history has outgrown its token budget
+    if context:
+        context.fit(messages, verbose)
+
+    # Call the Gemini model with the current conversation state
+    with tracer.span("generate_content", model=MODEL, messages=len(messages)) as span:
+        response = client.models.generate_content(
+            model=MODEL,
+            contents=messages,
+            config=generate_content_config(),
+        )
+        usage = response.usage_metadata
+        span.set(
+            prompt_tokens=usage.prompt_token_count if usage else None,
+            response_tokens=usage.candidates_token_count if usage else None,
+            function_calls=len(response.function_calls or []),
+        )
+
+    # Calibrate the local token estimator against the reported prompt size
+    if context:
+        context.observe(messages, response.usage_metadata)
+
+    # Print token usage details if verbose mode is enabled
+    if verbose:
+        print("Prompt tokens:", response.usage_metadata.prompt_token_count)
+        print("Response tokens:", response.usage_metadata.candidates_token_count)
+
+    # Append model candidates (possible responses) to the conversation
+    if response.candidates:
+        for candidate in response.candidates:
+            function_call_content = candidate.content
+            messages.append(function_call_content)
+
+    # If no function calls were requested, return the text response
+    if not response.function_calls:
+        return response.text
+
+    # Journal each function result as soon as its call finishes
+    journal = getattr(messages, "journal", None)
+    on_result = journal.record_function_result if journal else None
+
+    # If function calls are requested, execute them (independent calls run concurrently)
+    function_responses = []
+    with tracer.span("dispatch", calls=len(response.function_calls)):
+        function_call_results = call_functions(
+            response.function_calls, verbose, working_directory, on_result
+        )
+    for function_call_result in function_call_results:
+        if (
+            not function_call_result.parts
+            or not function_call_result.parts[0].function_response
+        ):
+            raise Exception("empty function call result")
+
+        # Print function responses in verbose mode
+        if verbose:
+            print(f"-> {function_call_result.parts[0].function_response.response}")
+
+        # Collect the function response parts
+        function_responses.append(function_call_result.parts[0])
+
+    # If no valid function responses were returned, stop with an error
+    if not function_responses:
+        raise Exception("no function responses generated, exiting.")
+
+    # Report how many tool reads were served from the cache
+    if verbose:
+        print(file_cache.stats())
+
+    # Add the function responses back into the conversation context
+    messages.append(types.Content(role="user", parts=function_responses))
@@ -0,0 +1,218 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google import genai
+from dotenv import load_dotenv
+
+from agent import run_agent
+from config import (
+    BATCH_CONCURRENCY,
+    BATCH_REQUESTS_PER_MINUTE,
+    BATCH_TOKENS_PER_MINUTE,
+    WORKING_DIR,
+)
+from context import ContextManager
+from manifest import initial_content
+from response_cache import CachingClient, ResponseCache
+from scheduler import ScheduledClient
+
+
+def read_tasks(stream):
+    """
+    Reads agent tasks from JSONL.
+
+    Each line is either a JSON object with a "prompt" (and optionally "id" and
+    "working_directory"), or a bare JSON string used as the prompt. Tasks
+    without a working directory all use WORKING_DIR, so they run one at a time.
+
+    Args:
+        stream: A text stream of JSONL lines.
+
+    Returns:
+        list[dict]: The tasks, each with "id", "prompt" and "working_directory".
+    """
+    tasks = []
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            record = {"prompt": record}
+        tasks.append(
+            {
+                "id": record.get("id", line_number),
+                "prompt": record["prompt"],
+                "working_directory": record.get("working_directory", WORKING_DIR),
+            }
+        )
+    return tasks
+
+
+def run_task(client, task, verbose=False):
+    """
+    Runs one independent agent session.
+
+    Args:
+        client: The (shared) Gemini client.
+        task (dict): The task, as returned by read_tasks.
+        verbose (bool): Whether to print detailed logs.
+
+    Returns:
+        dict: The result record written to the output JSONL.
+    """
+    started = time.monotonic()
+    messages = [initial_content(task["prompt"], task["working_directory"])]
+    result = {"id": task["id"], "prompt": task["prompt"]}
+    try:
+        final_response = run_agent(
+            client,
+            messages,
+            verbose,
+            ContextManager(),
+            task["working_directory"],
+        )
+        if final_response is None:
+            result["status"] = "max_iters"
+        else:
+            result["status"] = "ok"
+            result["response"] = final_response
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["turns"] = sum(1 for message in messages if message.role == "model")
+    result["elapsed_s"] = round(time.monotonic() - started, 3)
+    return result
+
+
+def run_batch(client, tasks, output, concurrency, verbose=False):
+    """
+    Runs many agent sessions concurrently, writing each result as soon as it is done.
+
+    Sessions share the file, search and import caches, which are keyed on
+    absolute paths, so tasks with the same working directory would edit and
+    test the same files at once. Those tasks run one after another, in input
+    order; tasks in different working directories run concurrently.
+
+    Args:
+        client: The Gemini client shared by every session.
+        tasks (list[dict]): The tasks to run.
+        output: A text stream the JSONL results are written to.
+        concurrency (int): Maximum number of sessions running at once.
+        verbose (bool): Whether to print detailed logs.
+
+    Returns:
+        list[dict]: The result records, in the same order as the tasks.
+    """
+    write_lock = threading.Lock()
+
+    def run_and_write(task):
+        result = run_task(client, task, verbose)
+        with write_lock:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        return result
+
+    # One queue of tasks per working directory (symlinks resolved)
+    groups = {}
+    for position, task in enumerate(tasks):
+        directory = os.path.realpath(task["working_directory"])
+        groups.setdefault(directory, []).append((position, task))
+
+    def run_group(group):
+        return [(position, run_and_write(task)) for position, task in group]
+
+    results = [None] * len(tasks)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for group_results in executor.map(run_group, groups.values()):
+            for position, result in group_results:
+                results[position] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many independent agent prompts concurrently."
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="JSONL file of prompts (default: read from stdin)",
+    )
+    parser.add_argument(
+        "--output", "-o", help="JSONL file for results (default: stdout)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help=f"sessions to run at once; tasks sharing a working directory run one at a time (default: {BATCH_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=BATCH_REQUESTS_PER_MINUTE,
+        help=f"global model requests per minute (default: {BATCH_REQUESTS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=BATCH_TOKENS_PER_MINUTE,
+        help=f"global prompt tokens per minute (default: {BATCH_TOKENS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse model responses to identical requests from the on-disk cache",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    options = parser.parse_args()
+
+    # Load environment variables from .env file (e.g., GEMINI_API_KEY)
+    load_dotenv()
+
+    if options.input == "-":
+        tasks = read_tasks(sys.stdin)
+    else:
+        with open(options.input, "r") as f:
+            tasks = read_tasks(f)
+
+    # One client (and connection pool) and one set of rate limits for every session
+    client = ScheduledClient(
+        genai.Client(api_key=os.environ.get("GEMINI_API_KEY")),
+        requests_per_minute=options.rpm,
+        tokens_per_minute=options.tpm,
+    )
+    response_cache = None
+    if options.cache:
+        # Cache hits skip the rate limits as well as the round trip
+        response_cache = ResponseCache()
+        client = CachingClient(client, response_cache)
+
+    output = open(options.output, "w") if options.output else sys.stdout
+    try:
+        # Session logs go to stderr so they never mix with the JSONL results
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_batch(
+                client, tasks, output, options.concurrency, options.verbose
+            )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    ok = sum(1 for result in results if result["status"] == "ok")
+    print(f"{ok}/{len(results)} tasks completed", file=sys.stderr)
+    if response_cache:
+        print(response_cache.stats(), file=sys.stderr)
+    sys.exit(0 if ok == len(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
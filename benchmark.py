@@ -0,0 +1,201 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from google.genai import types
+
+import agent
+from config import WORKING_DIR
+from context import ContextManager
+from replay import ReplayClient, load_recording
+
+# Recorded sessions replayed by the benchmark, one JSONL recording per scenario
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+
+
+class _Timed:
+    """Wraps a callable, adding up the time spent in it."""
+
+    def __init__(self, function):
+        self._function = function
+        self.total = 0.0
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._function(*args, **kwargs)
+        finally:
+            self.total += time.perf_counter() - started
+            self.calls += 1
+
+
+def run_scenario(pairs, working_directory):
+    """
+    Replays one recorded session against a working directory.
+
+    Args:
+        pairs (list): The (request, response) pairs of the recording.
+        working_directory (str): A scratch copy of the project the tools operate in.
+
+    Returns:
+        dict: Timings in seconds: "session" (end to end), "dispatch" (running the
+              tools), "model" (serving replayed responses) and "overhead" per
+              iteration (everything else the loop does), plus "iterations".
+    """
+    client = ReplayClient(pairs=pairs)
+    model = _Timed(client.models.generate_content)
+    client.models.generate_content = model
+    dispatch = _Timed(agent.call_functions)
+
+    # The prompt is the first message of the first recorded request
+    first = types.Content.model_validate(pairs[0][0]["contents"][0])
+    messages = [first]
+
+    original_call_functions = agent.call_functions
+    agent.call_functions = dispatch
+    try:
+        # Tool logs are not part of what is being measured
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            final_response = agent.run_agent(
+                client, messages, False, ContextManager(), working_directory
+            )
+            session = time.perf_counter() - started
+    finally:
+        agent.call_functions = original_call_functions
+
+    if final_response is None:
+        raise RuntimeError("replayed session did not reach its final response")
+    iterations = model.calls
+    return {
+        "session": session,
+        "dispatch": dispatch.total,
+        "model": model.total,
+        "overhead": (session - dispatch.total - model.total) / iterations,
+        "iterations": iterations,
+    }
+
+
+def _summarize(samples):
+    # Median and 95th percentile, in milliseconds
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+    }
+
+
+def benchmark(recordings, repeat, project=WORKING_DIR):
+    """
+    Replays each recording `repeat` times, each time in a fresh copy of the project.
+
+    Args:
+        recordings (list[str]): Paths of the recordings to replay.
+        repeat (int): Number of runs per recording.
+        project (str): The directory the recordings were made in.
+
+    Returns:
+        dict: Per scenario name, the median and p95 of each measured timing.
+    """
+    results = {}
+    for path in recordings:
+        pairs = load_recording(path)
+        samples = {"session": [], "dispatch": [], "overhead": []}
+        iterations = 0
+        # One untimed run first, so lazy imports and schema building aren't measured
+        for run in range(repeat + 1):
+            # Tools may write files, so every run starts from a pristine copy
+            with tempfile.TemporaryDirectory() as scratch:
+                working_directory = os.path.join(scratch, "project")
+                shutil.copytree(project, working_directory)
+                timings = run_scenario(pairs, working_directory)
+            if run == 0:
+                continue
+            iterations = timings["iterations"]
+            for name in samples:
+                samples[name].append(timings[name])
+
+        name = os.path.splitext(os.path.basename(path))[0]
+        results[name] = {"iterations": iterations, "runs": repeat}
+        for metric, values in samples.items():
+            results[name][metric] = _summarize(values)
+    return results
+
+
+def print_table(results):
+    header = f"{'scenario':<20} {'iters':>5} {'session ms':>21} {'dispatch ms':>21} {'overhead ms/iter':>21}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        columns = [
+            f"{result[metric]['median_ms']:.2f} (p95 {result[metric]['p95_ms']:.2f})"
+            for metric in ("session", "dispatch", "overhead")
+        ]
+        print(
+            f"{name:<20} {result['iterations']:>5} "
+            + " ".join(f"{column:>21}" for column in columns)
+        )
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the agent loop offline by replaying recorded sessions."
+    )
+    parser.add_argument(
+        "recordings",
+        nargs="*",
+        help=f"recordings to replay (default: every recording in {RECORDINGS_DIR})",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="runs per scenario (default: 20)"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the results as JSON"
+    )
+    parser.add_argument(
+        "--max-overhead-ms",
+        type=float,
+        help="fail if a scenario's median loop overhead per iteration exceeds this",
+    )
+    options = parser.parse_args()
+
+    recordings = options.recordings or sorted(
+        glob.glob(os.path.join(RECORDINGS_DIR, "*.jsonl"))
+    )
+    if not recordings:
+        print("No recordings to replay")
+        sys.exit(1)
+
+    results = benchmark(recordings, options.repeat)
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+    # Let CI fail on a regression in the loop's own cost
+    if options.max_overhead_ms is not None:
+        slow = [
+            name
+            for name, result in results.items()
+            if result["overhead"]["median_ms"] > options.max_overhead_ms
+        ]
+        if slow:
+            print(
+                f"Loop overhead above {options.max_overhead_ms} ms/iteration: {', '.join(slow)}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_benchmark()
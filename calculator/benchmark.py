@@ -0,0 +1,279 @@
+# benchmark.py
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pkg.calculator import Calculator, tokenize
+from pkg.render import render
+
+# Size of the long and pathological expressions, in tokens
+LONG_TOKENS = 10_000
+# Rows for the batch scenarios
+BATCH_ROWS = 10_000
+
+
+def long_expression(tokens, seed=0):
+    # A random chain of numbers and operators, the same on every run
+    rng = random.Random(seed)
+    parts = [str(rng.randint(1, 9))]
+    while len(parts) < tokens:
+        parts.append(rng.choice("+-*/"))
+        parts.append(str(rng.randint(1, 9)))
+    return " ".join(parts)
+
+
+def scenarios():
+    """
+    Builds the benchmark scenarios.
+
+    Returns:
+        dict: name -> (description, function to time, operations per call).
+    """
+    calculator = Calculator()
+    # No cache: every call pays for scanning and compiling
+    uncached = Calculator(cache_size=0)
+
+    short = "2 * 3 - 8 / 2 + 5"
+    # A one-off expression with names, decimals, exponents and parentheses
+    medium = "(rate * 1.5e2 - 3.25) / (x + 4) * -(y - 0.5) + 12 * (x / 3 - y)"
+    variables = {"rate": 0.2, "x": 7.0, "y": 2.0}
+    long = long_expression(LONG_TOKENS)
+    long_program = calculator.compile(long)
+    # Operator stack depth grows with the number of tokens
+    parentheses = "(" * (LONG_TOKENS // 2) + "1" + ")" * (LONG_TOKENS // 2)
+    negations = "-" * LONG_TOKENS + "1"
+    # Short expressions and their results, rendered as a batch
+    rendered = [long_expression(9, seed) for seed in range(BATCH_ROWS)]
+    results = [calculator.evaluate(expression) for expression in rendered]
+    columns = {
+        "x": [float(row) for row in range(BATCH_ROWS)],
+        "y": [float(row % 7) for row in range(BATCH_ROWS)],
+    }
+
+    return {
+        "short_cached": (
+            "evaluate a short expression (compiled program from the cache)",
+            lambda: calculator.evaluate(short),
+            1,
+        ),
+        "short_uncached": (
+            "evaluate a short expression, scanning and compiling it",
+            lambda: uncached.evaluate(short),
+            1,
+        ),
+        "short_scan": (
+            "scan a short expression into tokens",
+            lambda: list(tokenize(short)),
+            1,
+        ),
+        "medium_uncached": (
+            "evaluate a one-off expression with variables, scanning and compiling it",
+            lambda: uncached.evaluate(medium, **variables),
+            1,
+        ),
+        "long_compile": (
+            f"scan and compile a {LONG_TOKENS}-token expression",
+            lambda: uncached.compile(long),
+            1,
+        ),
+        "long_evaluate": (
+            f"run the compiled {LONG_TOKENS}-token expression",
+            lambda: calculator.evaluate_compiled(long_program),
+            1,
+        ),
+        "deep_parentheses": (
+            f"evaluate {LONG_TOKENS // 2} nested parentheses",
+            lambda: uncached.evaluate(parentheses),
+            1,
+        ),
+        "deep_negation": (
+            f"evaluate {LONG_TOKENS} chained unary minuses",
+            lambda: uncached.evaluate(negations),
+            1,
+        ),
+        "batch_evaluate": (
+            f"evaluate_batch over {BATCH_ROWS} rows (per row)",
+            lambda: calculator.evaluate_batch("x * 2 + y / 3 - 1", **columns),
+            BATCH_ROWS,
+        ),
+        "batch_render": (
+            f"render {BATCH_ROWS} short results (per result)",
+            lambda: [render(e, r) for e, r in zip(rendered, results)],
+            BATCH_ROWS,
+        ),
+        "long_render": (
+            f"render the {LONG_TOKENS}-token expression",
+            lambda: render(long, calculator.evaluate_compiled(long_program)),
+            1,
+        ),
+    }
+
+
+def time_scenario(function, operations, repeat, min_seconds=0.05):
+    """
+    Times a function, calling it enough times per sample to get a stable reading.
+
+    Args:
+        function (callable): What to time.
+        operations (int): How many operations one call performs.
+        repeat (int): Number of samples.
+        min_seconds (float): Minimum duration of one sample.
+
+    Returns:
+        list[float]: Microseconds per operation, one per sample.
+    """
+    # One untimed call, so the first sample doesn't pay for warming up
+    function()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    calls = max(1, int(min_seconds / elapsed)) if elapsed else 1000
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - started
+        samples.append(elapsed / (calls * operations) * 1_000_000)
+    return samples
+
+
+def _summarize(samples):
+    # Median and 95th percentile, in microseconds
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "p95_us": round(p95, 3),
+    }
+
+
+def benchmark(available, names, repeat):
+    """
+    Runs the selected scenarios.
+
+    Args:
+        available (dict): The scenarios, from scenarios().
+        names (list[str]): The scenarios to run; all of them if empty.
+        repeat (int): Samples per scenario.
+
+    Returns:
+        dict: Per scenario name, its description and the median and p95 time
+              per operation.
+    """
+    results = {}
+    for name, (description, function, operations) in available.items():
+        if names and name not in names:
+            continue
+        results[name] = {
+            "description": description,
+            "runs": repeat,
+            **_summarize(time_scenario(function, operations, repeat)),
+        }
+    return results
+
+
+def regressions(results, limits, baseline, tolerance):
+    """
+    Finds the scenarios that are slower than allowed.
+
+    Args:
+        results (dict): Results from benchmark().
+        limits (dict): Scenario name -> maximum median in microseconds.
+        baseline (dict | None): Earlier results (from --json) to compare against.
+        tolerance (float): How many times slower than the baseline a scenario may be.
+
+    Returns:
+        list[str]: One message per slow scenario.
+    """
+    slow = []
+    for name, result in results.items():
+        median = result["median_us"]
+        if name in limits and median > limits[name]:
+            slow.append(f"{name}: {median} us (limit {limits[name]} us)")
+        if baseline and name in baseline:
+            allowed = baseline[name]["median_us"] * tolerance
+            if median > allowed:
+                slow.append(
+                    f"{name}: {median} us (baseline {baseline[name]['median_us']} us, "
+                    f"allowed {round(allowed, 3)} us)"
+                )
+    return slow
+
+
+def parse_limit(text):
+    # "scenario=microseconds"
+    name, separator, value = text.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"expected SCENARIO=US, got {text!r}")
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the calculator and render offline."
+    )
+    parser.add_argument(
+        "scenarios", nargs="*", help="scenarios to run (default: all)"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="samples per scenario (default: 5)"
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument(
+        "--max",
+        type=parse_limit,
+        action="append",
+        default=[],
+        metavar="SCENARIO=US",
+        help="fail if a scenario's median time per operation exceeds this (repeatable)",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="results saved with --json; fail if a scenario got slower than --tolerance allows",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.25,
+        help="allowed slowdown against --baseline (default: 1.25)",
+    )
+    options = parser.parse_args()
+
+    available = scenarios()
+    unknown = set(options.scenarios) - set(available)
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    results = benchmark(available, options.scenarios, options.repeat)
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(
+                f"{name:<18} {result['median_us']:>12.3f} us (p95 {result['p95_us']:.3f})"
+                f"  {result['description']}"
+            )
+
+    baseline = None
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)
+
+    # Let CI fail when a calculator change makes a scenario slower
+    slow = regressions(results, dict(options.max), baseline, options.tolerance)
+    if slow:
+        print("Performance regression:", file=sys.stderr)
+        for message in slow:
+            print(f"  {message}", file=sys.stderr)
+        sys.exit(1)
+
+
+# Entry point: only run main() if this script is executed directly
+if __name__ == "__main__":
+    main()
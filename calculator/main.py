@@ -1,10 +1,105 @@
 # main.py
 
+import errno
+import os
+import socket
+import socketserver
+import stat
 import sys
 from pkg.calculator import Calculator
 from pkg.render import render
 
 
+def format_result(expression, result, use_render=False):
+    # Box the result, or print it the way render does (no ".0" on whole numbers)
+    if use_render:
+        return render(expression, result)
+    if isinstance(result, float) and result.is_integer():
+        return str(int(result))
+    return str(result)
+
+
+def serve(calculator, lines, write, use_render=False, flush=None):
+    """
+    Evaluates newline-delimited expressions until the input ends.
+
+    Each line gets one answer: the result, or "Error: ..." if the line could
+    not be evaluated. A bad line never stops the loop.
+
+    Args:
+        calculator (Calculator): The shared calculator (its compiled programs are reused).
+        lines (Iterable[str]): The expressions, one per line.
+        write (callable): Called with each answer, including its newline.
+        use_render (bool): Whether to box each result with render().
+        flush (callable, optional): Called after each answer, so a client
+                                    waiting for it gets it straight away.
+    """
+    for line in lines:
+        expression = line.strip()
+        # Blank lines get blank answers, so answers stay in step with lines
+        if not expression:
+            write("\n")
+        else:
+            try:
+                result = calculator.evaluate(expression)
+                write(format_result(expression, result, use_render) + "\n")
+            except Exception as e:
+                # Report the error and carry on with the next line
+                write(f"Error: {e}\n")
+        if flush is not None:
+            flush()
+
+
+def socket_server(calculator, path, use_render=False):
+    """
+    Creates (but does not start) a Unix socket server that serves each
+    connection like stdin.
+
+    Connections are handled on their own threads and share one Calculator.
+    Bytes that are not valid UTF-8 are replaced, so they get an error answer
+    instead of closing the connection.
+
+    Raises:
+        FileExistsError: If something other than a socket exists at path.
+        OSError: If another server is still listening on path (EADDRINUSE).
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            serve(
+                calculator,
+                (line.decode(errors="replace") for line in self.rfile),
+                lambda answer: self.wfile.write(answer.encode()),
+                use_render,
+                self.wfile.flush,
+            )
+
+    # Remove a socket left behind by a server that is gone, but never a live
+    # server's socket or anything that is not a socket
+    if os.path.lexists(path):
+        if not stat.S_ISSOCK(os.lstat(path).st_mode):
+            raise FileExistsError(f"{path} exists and is not a socket")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except ConnectionRefusedError:
+                os.unlink(path)
+            else:
+                raise OSError(errno.EADDRINUSE, f"address in use: {path}")
+    return socketserver.ThreadingUnixStreamServer(path, Handler)
+
+
+def serve_socket(calculator, path, use_render=False):
+    """Listens on a Unix socket until interrupted (see socket_server())."""
+    with socket_server(calculator, path, use_render) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+
 def main():
     # Create an instance of the Calculator class
     calculator = Calculator()
@@ -13,11 +108,31 @@ def main():
     if len(sys.argv) <= 1:
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
+        print("       python main.py --serve [--render]         (one expression per line on stdin)")
+        print("       python main.py --socket PATH [--render]   (one expression per line per connection)")
         print('Example: python main.py "3 + 5"')
         return
 
+    args = sys.argv[1:]
+    use_render = "--render" in args
+
+    # Long-running modes: evaluate many expressions with one process and one Calculator
+    if args[0] == "--serve":
+        serve(calculator, sys.stdin, sys.stdout.write, use_render, sys.stdout.flush)
+        return
+    if args[0] == "--socket":
+        if len(args) < 2:
+            print("Error: --socket needs a path")
+            return
+        try:
+            serve_socket(calculator, args[1], use_render)
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
     # Combine all command-line arguments into a single expression string
-    expression = " ".join(sys.argv[1:])
+    expression = " ".join(args)
 
     try:
         # Evaluate the expression using the Calculator class
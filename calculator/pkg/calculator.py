@@ -1,15 +1,147 @@
 # calculator.py
 
+import functools
+import itertools
+import math
+import operator
+import re
+
+# How many compiled expressions each Calculator keeps by default
+COMPILE_CACHE_SIZE = 1024
+
+# Unary minus binds tighter than every binary operator: "-2 * 3" is (-2) * 3
+UNARY_PRECEDENCE = 3
+
+# Token kinds produced by tokenize()
+NUMBER = "number"
+NAME = "name"
+OPERATOR = "operator"
+LPAREN = "lparen"
+RPAREN = "rparen"
+
+# Leading spaces, then one token: a number, a name, or any other single
+# non-space character (scanned as an operator, so unknown symbols are reported
+# where they are rather than skipped). The spaces are captured too, so columns
+# can be counted without a match object per token.
+_TOKEN_PATTERN = re.compile(
+    r"(\s*)((?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[^\W\d]\w*|\S)"
+)
+
+# Token kinds decided by the first character alone, for the common characters
+_KIND_BY_FIRST = {
+    **dict.fromkeys("0123456789", NUMBER),
+    **dict.fromkeys("+-*/", OPERATOR),
+    "(": LPAREN,
+    ")": RPAREN,
+}
+
+
+class ExpressionError(ValueError):
+    """An expression that cannot be compiled, and the column where the problem is."""
+
+    def __init__(self, message, column):
+        super().__init__(f"{message} at column {column}")
+        self.column = column
+
+
+def tokenize(expression):
+    """
+    Scans an expression into tokens in a single pass.
+
+    Spaces between tokens are optional, so "3+5" and "3 + 5" give the same
+    tokens.
+
+    Args:
+        expression (str): The expression to scan.
+
+    Returns:
+        Iterator[tuple[str, str, int]]: (kind, text, 1-based column) per token.
+    """
+    kinds = _KIND_BY_FIRST
+    column = 1
+    for spaces, text in _TOKEN_PATTERN.findall(expression):
+        column += len(spaces)
+        first = text[0]
+        kind = kinds.get(first)
+        if kind is None:
+            # The pattern only gives longer tokens to numbers and names
+            if first.isdecimal() or (first == "." and len(text) > 1):
+                kind = NUMBER
+            elif first.isalnum() or first == "_":
+                kind = NAME
+            else:
+                kind = OPERATOR
+        yield kind, text, column
+        column += len(text)
+
+
+def _divide(a, b):
+    # Division as NumPy does it for floats: x/0 is inf (signed) and 0/0 is nan
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _map_column(function, a, b):
+    # Applies an operator row by row; constants are repeated to line up with the column
+    def rows(value):
+        return itertools.repeat(value) if type(value) is float else value
+
+    try:
+        return list(map(function, rows(a), rows(b)))
+    except ZeroDivisionError:
+        # Rare, so only then pay for the slower division that never raises
+        return list(map(_divide, rows(a), rows(b)))
+
+
+@functools.cache
+def _numpy():
+    # NumPy is optional: batches fall back to pure Python without it
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class Program:
+    """
+    A compiled expression: a flat postfix program.
+
+    Each instruction is a float, which is pushed onto the stack, a string,
+    which pushes the value of the variable of that name, or a two-argument
+    function, which pops its operands and pushes its result. Programs are
+    validated when compiled, so running one never needs to check the stack.
+    """
+
+    __slots__ = ("expression", "instructions", "variables")
+
+    def __init__(self, expression, instructions):
+        self.expression = expression
+        self.instructions = instructions
+        # The variables the program reads, in order of first use
+        self.variables = tuple(
+            dict.fromkeys(i for i in instructions if type(i) is str)
+        )
+
+    def __repr__(self):
+        return f"Program({self.expression!r})"
+
+
 class Calculator:
     """A simple calculator that evaluates basic arithmetic expressions using infix notation."""
 
-    def __init__(self):
-        # Define supported operators as lambdas
+    def __init__(self, cache_size=COMPILE_CACHE_SIZE):
+        # Define supported operators as plain functions (the operator module's
+        # are implemented in C, so they are cheaper to call than lambdas)
         self.operators = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
+            "+": operator.add,
+            "-": operator.sub,
+            "*": operator.mul,
+            "/": operator.truediv,
         }
         # Define operator precedence for infix evaluation
         self.precedence = {
@@ -18,64 +150,241 @@ class Calculator:
             "*": 2,
             "/": 2,
         }
+        # Compiled programs, keyed on the expression string. The cache belongs
+        # to the instance because programs refer to this instance's operators.
+        self._compile_cached = functools.lru_cache(maxsize=cache_size)(self._compile)
+
+    def evaluate(self, expression, /, **variables):
+        # Variables are numbers like the constants, whatever type they were passed as
+        if variables:
+            variables = {name: float(value) for name, value in variables.items()}
+        # Compile the expression (or reuse the cached program) and run it
+        return self.evaluate_compiled(self.compile(expression), variables)
 
-    def evaluate(self, expression):
+    def compile(self, expression):
+        """
+        Compiles an expression into a reusable program.
+
+        Programs are cached, so compiling the same expression string again is
+        a dictionary lookup.
+
+        Args:
+            expression (str): An infix expression using + - * /, parentheses
+                              and unary minus. Spaces are optional. Names
+                              (such as "x" or "rate") are variables.
+
+        Returns:
+            Program | None: The program, or None for an empty expression.
+
+        Raises:
+            ExpressionError: If the expression is not valid (a ValueError
+                             that points at the offending column).
+        """
+        return self._compile_cached(expression)
+
+    def evaluate_compiled(self, program, variables=None):
+        """
+        Runs a program returned by compile().
+
+        The operators are applied with the operator module, so variables may
+        be any values that support arithmetic, including NumPy arrays.
+
+        Args:
+            program (Program | None): The compiled expression.
+            variables (dict, optional): Values of the program's variables.
+
+        Returns:
+            float | None: The result, or None for the empty program.
+
+        Raises:
+            ValueError: If a variable the program reads has no value.
+        """
+        # The empty expression compiles to no program at all
+        if program is None:
+            return None
+
+        if variables is None:
+            variables = {}
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        try:
+            for instruction in program.instructions:
+                # Numbers are pushed as they are
+                if type(instruction) is float:
+                    push(instruction)
+                # Variables are looked up by name
+                elif type(instruction) is str:
+                    push(variables[instruction])
+                else:
+                    # Pop operands in correct order: a operator b
+                    b = pop()
+                    push(instruction(pop(), b))
+        except KeyError:
+            # Report which variable is missing
+            self._check_variables(program, variables)
+            raise
+        return stack[0]
+
+    def evaluate_batch(self, expression, /, **arrays):
+        """
+        Evaluates one expression over whole columns of values.
+
+        The expression is compiled once and its program is run a column at a
+        time. With NumPy installed the columns are float arrays and every
+        operator is a single vectorized operation; without it, each operator
+        is applied to the columns with map(). Either way, dividing by zero
+        gives inf (or nan for 0/0) in that row rather than raising.
+
+        Args:
+            expression (str): The expression, for example "x * 2 + y".
+            **arrays: One sequence of values per variable, all the same length.
+
+        Returns:
+            numpy.ndarray | list[float] | None: One result per row (an array
+                if NumPy is installed, a list otherwise), or None for an
+                empty expression.
+
+        Raises:
+            ValueError: If a variable has no values, or the columns differ in length.
+        """
+        program = self.compile(expression)
+        if program is None:
+            return None
+        self._check_variables(program, arrays)
+
+        # Every column must have one value per row
+        lengths = {len(values) for values in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("all arrays must have the same length")
+        rows = lengths.pop() if lengths else 1
+
+        numpy = _numpy()
+        if numpy is not None:
+            columns = {
+                name: numpy.asarray(values, dtype=float)
+                for name, values in arrays.items()
+            }
+            # Arrays broadcast against constants on their own
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                result = self._evaluate_columns(
+                    program, columns, lambda function, a, b: function(a, b)
+                )
+            # An expression without variables still gives one result per row
+            if type(result) is float:
+                result = numpy.full(rows, result, dtype=float)
+            return result
+
+        # Each column is converted once, however often the expression uses it
+        columns = {name: list(map(float, arrays[name])) for name in program.variables}
+        result = self._evaluate_columns(program, columns, _map_column)
+        return [result] * rows if type(result) is float else result
+
+    def _evaluate_columns(self, program, columns, apply):
+        # Values on the stack are either columns or floats (constants);
+        # apply(function, a, b) combines a column with a column or a constant
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for instruction in program.instructions:
+            if type(instruction) is float:
+                push(instruction)
+            elif type(instruction) is str:
+                push(columns[instruction])
+            else:
+                b = pop()
+                a = pop()
+                if type(a) is float and type(b) is float:
+                    # Constant parts of the expression are computed once
+                    if instruction is operator.truediv:
+                        instruction = _divide
+                    push(instruction(a, b))
+                else:
+                    push(apply(instruction, a, b))
+        return stack[0]
+
+    def _check_variables(self, program, variables):
+        # Raise for the first variable that has no value
+        for name in program.variables:
+            if name not in variables:
+                raise ValueError(f"undefined variable: {name}")
+
+    def _compile(self, expression):
         # Return None for empty or whitespace-only expressions
         if not expression or expression.isspace():
             return None
-        # Tokenize the expression by splitting on spaces
-        tokens = expression.strip().split()
-        # Evaluate the tokenized infix expression
-        return self._evaluate_infix(tokens)
-
-    def _evaluate_infix(self, tokens):
-        # Stack to hold numeric values
-        values = []
-        # Stack to hold operators
+        # Scan and translate the infix expression to postfix in one pass
+        return Program(expression, tuple(self._compile_infix(tokenize(expression))))
+
+    def _compile_infix(self, tokens):
+        # The postfix program being built
+        program = []
+        # Stack of (precedence, function, column); "(" has precedence 0 and no
+        # function, so it stops every precedence loop without a separate check
         operators = []
+        # Whether the next token must start an operand (rather than be an operator)
+        expect_operand = True
+        kind = text = column = None
+
+        for kind, text, column in tokens:
+            # Symbols that are not operators are rejected wherever they appear
+            if kind == OPERATOR and text not in self.operators:
+                raise ExpressionError(f"invalid token: {text}", column)
 
-        for token in tokens:
-            if token in self.operators:
+            if expect_operand:
+                if kind == NUMBER:
+                    program.append(float(text))
+                    expect_operand = False
+                elif kind == NAME:
+                    # Names are variables, looked up when the program runs
+                    program.append(text)
+                    expect_operand = False
+                elif kind == LPAREN:
+                    operators.append((0, None, column))
+                elif text == "-":
+                    # Unary minus: multiply the operand that follows by -1
+                    program.append(-1.0)
+                    operators.append((UNARY_PRECEDENCE, operator.mul, column))
+                elif kind == OPERATOR:
+                    raise ExpressionError(f"not enough operands for operator {text}", column)
+                else:
+                    raise ExpressionError("unexpected )", column)
+            elif kind == OPERATOR:
                 # While the top operator has higher or equal precedence, apply it
-                while (
-                    operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
-                ):
-                    self._apply_operator(operators, values)
+                precedence = self.precedence[text]
+                while operators and operators[-1][0] >= precedence:
+                    self._apply_operator(operators, program)
                 # Push the current operator onto the stack
-                operators.append(token)
+                operators.append((precedence, self.operators[text], column))
+                expect_operand = True
+            elif kind == RPAREN:
+                # Apply everything back to the matching "("
+                while operators and operators[-1][0]:
+                    self._apply_operator(operators, program)
+                if not operators:
+                    raise ExpressionError("unmatched )", column)
+                operators.pop()
             else:
-                # Try to convert the token to a float and push to values stack
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    # Raise an error if token is not a valid number
-                    raise ValueError(f"invalid token: {token}")
+                # Two operands in a row, such as "3 5" or "2 (3)"
+                raise ExpressionError(
+                    "invalid expression: expected an operator", column
+                )
+
+        # The expression must not end where an operand is expected
+        if expect_operand:
+            if kind == LPAREN:
+                raise ExpressionError("unmatched (", column)
+            raise ExpressionError(f"not enough operands for operator {text}", column)
 
         # Apply any remaining operators
         while operators:
-            self._apply_operator(operators, values)
-
-        # There should be exactly one value left, the final result
-        if len(values) != 1:
-            raise ValueError("invalid expression")
-
-        return values[0]
-
-    def _apply_operator(self, operators, values):
-        # Return early if no operators to apply
-        if not operators:
-            return
-
-        # Pop the operator from the stack
-        operator = operators.pop()
-        # Ensure there are at least two operands to apply the operator
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
-
-        # Pop operands in correct order: a operator b
-        b = values.pop()
-        a = values.pop()
-        # Apply the operator and push the result back to values stack
-        values.append(self.operators[operator](a, b))
+            if not operators[-1][0]:
+                raise ExpressionError("unmatched (", operators[-1][2])
+            self._apply_operator(operators, program)
+
+        return program
+
+    def _apply_operator(self, operators, program):
+        # Pop the operator from the stack and emit it; when the program runs
+        # it replaces its two operands with one result
+        program.append(operators.pop()[1])
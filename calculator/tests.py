@@ -1,7 +1,14 @@
 # tests.py
 
+import errno
+import math
+import os
+import socket
+import tempfile
+import threading
 import unittest
-from pkg.calculator import Calculator
+from main import serve, socket_server
+from pkg.calculator import Calculator, ExpressionError
 
 
 class TestCalculator(unittest.TestCase):
@@ -56,6 +63,133 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_unspaced_expression(self):
+        # Test that spaces between tokens are optional
+        result = self.calculator.evaluate("3+5*2")
+        self.assertEqual(result, 13)
+
+    def test_parentheses(self):
+        # Test that parentheses override operator precedence
+        result = self.calculator.evaluate("(3 + 5) * (10 - 8) / 4")
+        self.assertEqual(result, 4)
+
+    def test_unary_minus(self):
+        # Test negative numbers and negated subexpressions
+        self.assertEqual(self.calculator.evaluate("-3 * -2"), 6)
+        self.assertEqual(self.calculator.evaluate("2 - -(1 + 2)"), 5)
+
+    def test_error_column(self):
+        # Test that errors point at the offending column
+        for expression, column in (("3 + $", 5), ("(3 + 5", 1), ("3 + 5)", 6), ("3 5", 3)):
+            with self.assertRaises(ExpressionError) as context:
+                self.calculator.evaluate(expression)
+            self.assertEqual(context.exception.column, column)
+
+    def test_compiled_program(self):
+        # Test that a compiled program can be run repeatedly
+        program = self.calculator.compile("2 * 3 - 8 / 2 + 5")
+        self.assertEqual(self.calculator.evaluate_compiled(program), 7)
+        self.assertEqual(self.calculator.evaluate_compiled(program), 7)
+        self.assertIsNone(self.calculator.evaluate_compiled(self.calculator.compile(" ")))
+
+    def test_compile_cache(self):
+        # Test that compiling the same expression again reuses the program
+        first = self.calculator.compile("3 + 5")
+        self.assertIs(self.calculator.compile("3 + 5"), first)
+        self.assertIsNot(self.calculator.compile("3 + 6"), first)
+
+    def test_compile_errors(self):
+        # Test that invalid expressions are rejected when compiled
+        for expression in ("$ 3 5", "+ 3", "3 5"):
+            with self.assertRaises(ValueError):
+                self.calculator.compile(expression)
+
+    def test_variables(self):
+        # Test that names in an expression are read from the keyword arguments
+        result = self.calculator.evaluate("x * 2 + y", x=3, y=1)
+        self.assertEqual(result, 7)
+        self.assertEqual(self.calculator.compile("x * x + y").variables, ("x", "y"))
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x * 2 + y", x=3)
+
+    def test_variable_values(self):
+        # Test that values become floats and any name can be a variable
+        result = self.calculator.evaluate("x", x=4)
+        self.assertEqual(result, 4.0)
+        self.assertIs(type(result), float)
+        self.assertEqual(self.calculator.evaluate("expression + 1", expression=2), 3.0)
+        result = self.calculator.evaluate_batch("expression * 2", expression=[1, 2])
+        self.assertEqual(list(result), [2.0, 4.0])
+
+    def test_evaluate_batch(self):
+        # Test that one expression is applied to every row of the columns
+        result = self.calculator.evaluate_batch("x * 2 + y", x=[1, 2, 3], y=[10, 20, 30])
+        self.assertEqual(list(result), [12, 24, 36])
+        # Constant expressions still give one result per row
+        result = self.calculator.evaluate_batch("2 * 3 + 1", x=[1, 2])
+        self.assertEqual(list(result), [7, 7])
+        self.assertIsNone(self.calculator.evaluate_batch(""))
+
+    def test_evaluate_batch_division_by_zero(self):
+        # Test that dividing by zero gives inf or nan in that row, not an error
+        result = list(self.calculator.evaluate_batch("x / y", x=[1, -2, 0, 3], y=[0, 0, 0, 1]))
+        self.assertEqual(result[:2], [math.inf, -math.inf])
+        self.assertTrue(math.isnan(result[2]))
+        self.assertEqual(result[3], 3.0)
+        result = self.calculator.evaluate_batch("x + 1 / 0", x=[1, 2])
+        self.assertEqual(list(result), [math.inf, math.inf])
+
+    def test_evaluate_batch_errors(self):
+        # Test that missing variables and ragged columns raise a ValueError
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_batch("x + y", x=[1, 2])
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_batch("x + y", x=[1, 2], y=[1])
+
+    def test_serve(self):
+        # Test that every line gets an answer, and bad lines don't stop the loop
+        answers = []
+        serve(self.calculator, ["3 + 5\n", "\n", "$ 3 5\n", "10 / 4\n"], answers.append)
+        self.assertEqual(answers, ["8\n", "\n", "Error: invalid token: $ at column 1\n", "2.5\n"])
+
+    def test_serve_socket(self):
+        # Test a round trip over a Unix socket, where invalid UTF-8 gets an
+        # error answer and the connection carries on
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "calc.sock")
+            with socket_server(self.calculator, path) as server:
+                thread = threading.Thread(target=server.serve_forever, args=(0.01,))
+                thread.start()
+                try:
+                    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                        client.connect(path)
+                        client.sendall(b"3 + 5\n\xff\n10 / 4\n")
+                        client.shutdown(socket.SHUT_WR)
+                        answers = client.makefile("rb").read().decode()
+                    # A second server must not take over a live server's socket
+                    with self.assertRaises(OSError) as raised:
+                        socket_server(self.calculator, path)
+                    self.assertEqual(raised.exception.errno, errno.EADDRINUSE)
+                finally:
+                    server.shutdown()
+                    thread.join()
+            self.assertEqual(
+                answers.splitlines(),
+                ["8", "Error: invalid token: \ufffd at column 1", "2.5"],
+            )
+
+            # Once nothing listens on it, the stale socket is replaced
+            with socket_server(self.calculator, path):
+                self.assertTrue(os.path.exists(path))
+
+            # A path that is not a socket is never removed
+            other = os.path.join(directory, "notes.txt")
+            with open(other, "w") as f:
+                f.write("keep me")
+            with self.assertRaises(FileExistsError):
+                socket_server(self.calculator, other)
+            self.assertTrue(os.path.exists(other))
+
 
 # Run the unit tests when this script is executed directly
 if __name__ == "__main__":
@@ -1,24 +1,64 @@
+import functools
+import importlib
+import json
+
 from google.genai import types
 
-# Import function implementations and their schemas
-from functions.get_files_info import get_files_info, schema_get_files_info
-from functions.get_file_content import get_file_content, schema_get_file_content
-from functions.run_python import run_python_file, schema_run_python_file
-from functions.write_file_content import write_file, schema_write_file
 from config import WORKING_DIR
+from tracing import tracer
+
+# Every function the LLM can call: name -> (module, schema name), in the order
+# they are declared to the model. Modules are only imported when first needed.
+TOOLS = {
+    "get_files_info": ("functions.get_files_info", "schema_get_files_info"),
+    "get_file_content": ("functions.get_file_content", "schema_get_file_content"),
+    "run_python_file": ("functions.run_python", "schema_run_python_file"),
+    "write_file": ("functions.write_file_content", "schema_write_file"),
+    "patch_file": ("functions.patch_file", "schema_patch_file"),
+    "run_affected_tests": ("functions.test_impact", "schema_run_affected_tests"),
+    "search_code": ("functions.search", "schema_search_code"),
+    "find_symbol": ("functions.search", "schema_find_symbol"),
+}
 
-# Define all available functions and their schemas so the LLM knows what it can call
-available_functions = types.Tool(
-    function_declarations=[
-        schema_get_files_info,
-        schema_get_file_content,
-        schema_run_python_file,
-        schema_write_file,
-    ]
-)
+
+@functools.cache
+def get_tool(function_name):
+    """
+    Imports a tool's implementation on first use.
+
+    Returns:
+        callable | None: The function, or None if there is no such tool.
+    """
+    if function_name not in TOOLS:
+        return None
+    module_name, _ = TOOLS[function_name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+@functools.cache
+def get_available_functions():
+    """Builds the tool declaration with every function's schema, once."""
+    return types.Tool(
+        function_declarations=[
+            getattr(importlib.import_module(module_name), schema_name)
+            for module_name, schema_name in TOOLS.values()
+        ]
+    )
+
+
+def announce_call(function_call_part, verbose=False):
+    """Prints which function is about to be called (with its arguments if verbose)."""
+    if verbose:
+        print(
+            f" - Calling function: {function_call_part.name}({function_call_part.args})"
+        )
+    else:
+        print(f" - Calling function: {function_call_part.name}")
 
 
-def call_function(function_call_part, verbose=False):
+def call_function(
+    function_call_part, verbose=False, working_directory=WORKING_DIR, announce=True
+):
     """
     Executes a function requested by the LLM.
 
@@ -26,30 +66,23 @@ def call_function(function_call_part, verbose=False):
         function_call_part: The function call request from the LLM,
                             including the name and arguments.
         verbose (bool): Whether to print detailed logs.
+        working_directory (str): The directory the function is confined to.
+        announce (bool): Whether to print the call first. The dispatcher
+                         announces calls itself, from the submitting thread,
+                         so lines from concurrent calls never interleave.
 
     Returns:
         types.Content: A function response wrapped in a format
                        that the LLM can understand.
     """
     # Show what function is being called
-    if verbose:
-        print(
-            f" - Calling function: {function_call_part.name}({function_call_part.args})"
-        )
-    else:
-        print(f" - Calling function: {function_call_part.name}")
-
-    # Map function names (strings) to their actual implementations
-    function_map = {
-        "get_files_info": get_files_info,
-        "get_file_content": get_file_content,
-        "run_python_file": run_python_file,
-        "write_file": write_file,
-    }
+    if announce:
+        announce_call(function_call_part, verbose)
 
-    # Check if the requested function exists in the map
+    # Look up the implementation of the requested function
     function_name = function_call_part.name
-    if function_name not in function_map:
+    function = get_tool(function_name)
+    if function is None:
         # Return an error response if function is unknown
         return types.Content(
             role="tool",
@@ -63,10 +96,16 @@ def call_function(function_call_part, verbose=False):
 
     # Prepare arguments for the function, adding the working directory
     args = dict(function_call_part.args)
-    args["working_directory"] = WORKING_DIR
+    args["working_directory"] = working_directory
 
-    # Execute the mapped function with the provided arguments
-    function_result = function_map[function_name](**args)
+    # Execute the mapped function with the provided arguments, timing it when tracing
+    with tracer.span("call_function", tool=function_name) as span:
+        function_result = function(**args)
+        if tracer.enabled:
+            span.set(
+                args_chars=len(json.dumps(function_call_part.args or {}, default=str)),
+                result_chars=len(function_result),
+            )
 
     # Return the function result wrapped in a response format
     return types.Content(
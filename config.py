@@ -1,9 +1,76 @@
+import os
+
 # Maximum number of characters allowed for input/output handling
 MAX_CHARS = 10000  
 
 # Directory where the program will run or store files (e.g., the calculator project)
 WORKING_DIR = "./calculator"  
 
+# Gemini model used for every agent turn
+MODEL = "gemini-2.0-flash-001"
+
 # Maximum number of iterations the assistant is allowed to loop through
 # before stopping (to prevent infinite loops)
-MAX_ITERS = 20  
\ No newline at end of file
+MAX_ITERS = 20
+
+# Maximum number of function calls from a single model turn that may run
+# concurrently (calls touching the same path are still run in order)
+MAX_WORKERS = 8
+
+# Estimated token budget for the conversation history; older tool results are
+# compacted once the history grows past it
+CONTEXT_TOKEN_BUDGET = 32000
+
+# Maximum total size in bytes of cached file reads and directory listings
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Maximum number of entries returned per page of a directory listing
+LIST_PAGE_SIZE = 200
+
+# Number of pre-warmed Python worker processes used by run_python_file
+# (0 disables the pool and starts a fresh interpreter for every run)
+PYTHON_POOL_SIZE = 0
+
+# Modules each pooled worker imports once at startup
+PYTHON_POOL_PRELOAD = ["unittest", "json", "re"]
+
+# Maximum bytes of stdout and of stderr kept from a script run; beyond this only
+# the first and last halves are kept and the rest is reported as dropped
+MAX_OUTPUT_BYTES = 20000
+
+# Whether to kill a script as soon as its output exceeds MAX_OUTPUT_BYTES
+KILL_ON_OUTPUT_LIMIT = False
+
+# Number of agent sessions batch.py runs at the same time
+BATCH_CONCURRENCY = 8
+
+# Model requests per minute allowed across all batch sessions
+BATCH_REQUESTS_PER_MINUTE = 60
+
+# Prompt tokens per minute allowed across all batch sessions
+BATCH_TOKENS_PER_MINUTE = 1000000
+
+# Retries for model calls that fail with a retryable error (429, 5xx, network)
+MODEL_MAX_RETRIES = 5
+
+# Backoff before retrying a model call: a random delay up to
+# MODEL_RETRY_BASE_DELAY * 2**attempt seconds, capped at MODEL_RETRY_MAX_DELAY
+MODEL_RETRY_BASE_DELAY = 1.0
+MODEL_RETRY_MAX_DELAY = 60.0
+
+# Directory where session journals are written (resume one with --resume <id>)
+SESSION_DIR = ".sessions"
+
+# On-disk cache of model responses (enabled with --cache): where entries are
+# stored, how long they stay valid in seconds, and their maximum total size
+RESPONSE_CACHE_DIR = ".response_cache"
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Estimated token budget for the workspace manifest added to the first message,
+# and where the per-file symbols it lists are cached between runs (next to this
+# file, so every run shares one cache whatever directory it is started from)
+MANIFEST_TOKEN_BUDGET = 1500
+MANIFEST_CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".manifest_cache"
+)
@@ -0,0 +1,232 @@
+import os
+
+from google.genai import types
+
+from config import CONTEXT_TOKEN_BUDGET
+
+# Function calls whose results only depend on their arguments and the files they read
+_READ_FUNCTIONS = {"get_file_content", "get_files_info", "run_python_file"}
+
+# How many of the most recent messages are never compacted
+_PROTECTED_MESSAGES = 2
+
+# Characters kept from a summarized tool result
+_SUMMARY_CHARS = 200
+
+# Suffix marking a summarized result, so it is never summarized twice
+_SUMMARY_MARKER = "characters removed to save context]"
+
+
+def _call_key(function_call):
+    """
+    Builds a key identifying what a read-only function call looked at.
+
+    Args:
+        function_call (types.FunctionCall): The call to describe.
+
+    Returns:
+        tuple | None: A hashable key, or None if the call has side effects.
+    """
+    if function_call.name not in _READ_FUNCTIONS:
+        return None
+    args = function_call.args or {}
+    path = args.get("file_path", args.get("directory", "."))
+    other_args = sorted(
+        (key, value)
+        for key, value in args.items()
+        if key not in ("file_path", "directory")
+    )
+    return (function_call.name, os.path.normpath(path), repr(other_args))
+
+
+def _written_path(function_call):
+    # Returns the normalized path a call writes to, if any
+    if function_call.name in ("write_file", "patch_file"):
+        return os.path.normpath((function_call.args or {}).get("file_path", "."))
+    return None
+
+
+class ContextManager:
+    """
+    Keeps the conversation history within a token budget.
+
+    Token costs are estimated locally from the serialized size of each message
+    and calibrated against the prompt token counts reported by the API. When
+    the history grows past the budget, stale tool results (reads superseded by
+    a later write or re-read of the same path) are replaced by short stubs,
+    and then the oldest remaining tool results are summarized.
+    """
+
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, chars_per_token=4.0):
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        # Cached estimates, keyed by message identity: id -> (message, tokens)
+        self._estimates = {}
+
+    def estimate(self, message):
+        """
+        Estimates the token cost of a single message.
+
+        Args:
+            message (types.Content): The message to measure.
+
+        Returns:
+            int: The estimated number of tokens.
+        """
+        cached = self._estimates.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        size = len(message.model_dump_json(exclude_none=True))
+        tokens = int(size / self.chars_per_token) + 1
+        self._estimates[id(message)] = (message, tokens)
+        return tokens
+
+    def total(self, messages):
+        """Returns the estimated token cost of the whole history."""
+        return sum(self.estimate(message) for message in messages)
+
+    def observe(self, messages, usage_metadata):
+        """
+        Calibrates the local estimator using the API's reported prompt size.
+
+        Args:
+            messages (list[types.Content]): The history that was sent.
+            usage_metadata: The usage metadata from the model response.
+        """
+        if not usage_metadata or not usage_metadata.prompt_token_count:
+            return
+        size = sum(
+            len(message.model_dump_json(exclude_none=True)) for message in messages
+        )
+        # The system prompt and tool schemas are counted too, so this errs on
+        # the side of overestimating the history
+        self.chars_per_token = max(1.0, size / usage_metadata.prompt_token_count)
+        self._estimates.clear()
+
+    def fit(self, messages, verbose=False):
+        """
+        Compacts the history in place until it fits within the token budget.
+
+        Args:
+            messages (list[types.Content]): The conversation history.
+            verbose (bool): Whether to print detailed logs.
+
+        Returns:
+            int: The estimated number of tokens freed.
+        """
+        before = self.total(messages)
+        if before <= self.token_budget:
+            return 0
+
+        # First drop results that later calls have made stale, then summarize
+        # the oldest results until the history fits
+        self._drop_stale_results(messages)
+        for index in range(len(messages) - _PROTECTED_MESSAGES):
+            if self.total(messages) <= self.token_budget:
+                break
+            self._summarize_message(messages, index)
+
+        after = self.total(messages)
+        if verbose:
+            print(f"Context compacted: ~{before} -> ~{after} tokens")
+        return before - after
+
+    def _function_calls(self, messages):
+        """
+        Pairs every function response in the history with the call that produced it.
+
+        Yields:
+            tuple: (message_index, part_index, function_call)
+        """
+        for index, message in enumerate(messages[:-1]):
+            if message.role != "model" or not message.parts:
+                continue
+            calls = [part.function_call for part in message.parts if part.function_call]
+            reply = messages[index + 1]
+            response_indexes = [
+                i for i, part in enumerate(reply.parts or []) if part.function_response
+            ]
+            # Responses are appended in the same order the calls were requested
+            for function_call, part_index in zip(calls, response_indexes):
+                yield index + 1, part_index, function_call
+
+    def _drop_stale_results(self, messages):
+        # Walk the history backwards so "later" calls are seen first
+        seen_reads = set()
+        written = set()
+        stale = []
+        for message_index, part_index, function_call in reversed(
+            list(self._function_calls(messages))
+        ):
+            path = _written_path(function_call)
+            if path is not None:
+                written.add(path)
+                continue
+            key = _call_key(function_call)
+            if key is None:
+                continue
+            if key in seen_reads or key[1] in written:
+                stale.append((message_index, part_index, key))
+            seen_reads.add(key)
+
+        for message_index, part_index, key in stale:
+            if message_index >= len(messages) - _PROTECTED_MESSAGES:
+                continue
+            response = messages[message_index].parts[part_index].function_response
+            if str((response.response or {}).get("result", "")).startswith("[Stale"):
+                continue
+            self._replace_response(
+                messages,
+                message_index,
+                part_index,
+                f'[Stale result of {key[0]} on "{key[1]}" removed: superseded by a later call]',
+            )
+
+    def _summarize_message(self, messages, index):
+        message = messages[index]
+        for part_index, part in enumerate(message.parts or []):
+            if part.function_call and part.function_call.name == "write_file":
+                self._summarize_write(messages, index, part_index)
+                continue
+            if not part.function_response:
+                continue
+            result = str((part.function_response.response or {}).get("result", ""))
+            if len(result) <= _SUMMARY_CHARS or result.endswith(_SUMMARY_MARKER):
+                continue
+            self._replace_response(
+                messages,
+                index,
+                part_index,
+                result[:_SUMMARY_CHARS]
+                + f"\n[...{len(result) - _SUMMARY_CHARS} {_SUMMARY_MARKER}",
+            )
+
+    def _summarize_write(self, messages, message_index, part_index):
+        # The written content is on disk, so the model can read it back if needed
+        message = messages[message_index]
+        function_call = message.parts[part_index].function_call
+        args = dict(function_call.args or {})
+        content = str(args.get("content", ""))
+        if len(content) <= _SUMMARY_CHARS or content.endswith(_SUMMARY_MARKER):
+            return
+        args["content"] = (
+            content[:_SUMMARY_CHARS]
+            + f"\n[...{len(content) - _SUMMARY_CHARS} {_SUMMARY_MARKER}"
+        )
+        parts = list(message.parts)
+        parts[part_index] = types.Part(
+            function_call=types.FunctionCall(
+                id=function_call.id, name=function_call.name, args=args
+            )
+        )
+        messages[message_index] = types.Content(role=message.role, parts=parts)
+
+    def _replace_response(self, messages, message_index, part_index, result):
+        # Contents are shared with the caller, so build new objects instead of mutating
+        message = messages[message_index]
+        function_response = message.parts[part_index].function_response
+        parts = list(message.parts)
+        parts[part_index] = types.Part.from_function_response(
+            name=function_response.name, response={"result": result}
+        )
+        messages[message_index] = types.Content(role=message.role, parts=parts)
@@ -0,0 +1,176 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from call_function import announce_call, call_function
+from config import MAX_WORKERS, WORKING_DIR
+
+
+def _call_footprint(function_call_part):
+    """
+    Describes which paths a function call reads and writes.
+
+    Args:
+        function_call_part: The function call request from the LLM.
+
+    Returns:
+        tuple: (reads, writes), each a set of normalized relative paths.
+               The special path "." stands for the whole working directory.
+    """
+    args = function_call_part.args or {}
+    name = function_call_part.name
+
+    if name in ("write_file", "patch_file"):
+        return set(), {os.path.normpath(args.get("file_path", "."))}
+    if name == "get_file_content":
+        return {os.path.normpath(args.get("file_path", "."))}, set()
+    if name == "get_files_info":
+        return {os.path.normpath(args.get("directory", "."))}, set()
+
+    # Anything else (e.g. running a script) may read any file in the working directory
+    return {"."}, set()
+
+
+def _overlaps(path_a, path_b):
+    # Two paths overlap if they are equal or one contains the other
+    if path_a == "." or path_b == ".":
+        return True
+    return (
+        path_a == path_b
+        or path_a.startswith(path_b + os.sep)
+        or path_b.startswith(path_a + os.sep)
+    )
+
+
+def _conflicts(footprint_a, footprint_b):
+    # Calls conflict when either one writes a path the other reads or writes
+    reads_a, writes_a = footprint_a
+    reads_b, writes_b = footprint_b
+    for written in writes_a:
+        if any(_overlaps(written, path) for path in reads_b | writes_b):
+            return True
+    for written in writes_b:
+        if any(_overlaps(written, path) for path in reads_a):
+            return True
+    return False
+
+
+class FunctionCallDispatcher:
+    """
+    Runs function calls on a bounded thread pool as soon as they are submitted.
+
+    Calls that touch the same path as an earlier write (or write a path an
+    earlier call reads) wait for the earlier call to finish, so the observable
+    effects match sequential execution.
+    """
+
+    def __init__(
+        self, verbose=False, max_workers=MAX_WORKERS, working_directory=WORKING_DIR
+    ):
+        self.verbose = verbose
+        self.working_directory = working_directory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # (footprint, future) for every call submitted so far, in order
+        self._submitted = []
+
+    def submit(self, function_call_part):
+        """
+        Schedules a function call, ordered after any earlier conflicting calls.
+
+        Args:
+            function_call_part: The function call request from the LLM.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the types.Content response.
+        """
+        footprint = _call_footprint(function_call_part)
+
+        # Earlier calls are always picked up by the pool first, so waiting
+        # on them from inside a worker cannot deadlock
+        dependencies = [
+            future
+            for earlier, future in self._submitted
+            if _conflicts(earlier, footprint)
+        ]
+
+        def run():
+            # Wait for every earlier conflicting call before running this one
+            for dependency in dependencies:
+                dependency.result()
+            return call_function(
+                function_call_part,
+                self.verbose,
+                self.working_directory,
+                announce=False,
+            )
+
+        # Print the call here rather than on the worker, so lines stay whole
+        # and appear in the order the model requested the calls
+        announce_call(function_call_part, self.verbose)
+
+        # Run in a copy of the caller's context, so tool spans nest under its span
+        future = self._executor.submit(contextvars.copy_context().run, run)
+        self._submitted.append((footprint, future))
+        return future
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def result_reporter(index, on_result):
+    """Returns a Future callback passing a successful result on to on_result(index, result)."""
+
+    def callback(future):
+        if future.exception() is None:
+            on_result(index, future.result())
+
+    return callback
+
+
+def call_functions(
+    function_call_parts, verbose=False, working_directory=WORKING_DIR, on_result=None
+):
+    """
+    Executes all function calls requested by the LLM in one turn, running
+    independent calls concurrently on a bounded thread pool.
+
+    Args:
+        function_call_parts (list): The function call requests from the LLM.
+        verbose (bool): Whether to print detailed logs.
+        working_directory (str): The directory the functions operate in.
+        on_result (callable, optional): Called as on_result(index, result) as
+                                        soon as each call finishes.
+
+    Returns:
+        list[types.Content]: The function responses, in the same order as
+                             the requested calls.
+    """
+    function_call_parts = list(function_call_parts)
+
+    # A single call gains nothing from a thread pool
+    if len(function_call_parts) <= 1:
+        results = []
+        for index, part in enumerate(function_call_parts):
+            result = call_function(part, verbose, working_directory)
+            if on_result:
+                on_result(index, result)
+            results.append(result)
+        return results
+
+    workers = min(MAX_WORKERS, len(function_call_parts))
+    with FunctionCallDispatcher(verbose, workers, working_directory) as dispatcher:
+        futures = [dispatcher.submit(part) for part in function_call_parts]
+
+        # Report each result as it completes, not in the order requested
+        if on_result:
+            for index, future in enumerate(futures):
+                future.add_done_callback(result_reporter(index, on_result))
+
+        # Collect results in the original order (re-raises the first failure)
+        return [future.result() for future in futures]
@@ -0,0 +1,115 @@
+from google.genai import errors, types
+
+
+def text_response(text, prompt_tokens=10, response_tokens=5):
+    """Builds a model response containing only text."""
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)])
+            )
+        ],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+        ),
+    )
+
+
+def function_call_response(calls, prompt_tokens=10, response_tokens=5):
+    """
+    Builds a model response requesting function calls.
+
+    Args:
+        calls (list[tuple[str, dict]]): (function name, arguments) for each call.
+    """
+    parts = [
+        types.Part(function_call=types.FunctionCall(name=name, args=args))
+        for name, args in calls
+    ]
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(content=types.Content(role="model", parts=parts))
+        ],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=response_tokens,
+        ),
+    )
+
+
+# Status names the Gemini API reports alongside common HTTP error codes
+_STATUS_NAMES = {
+    400: "INVALID_ARGUMENT",
+    403: "PERMISSION_DENIED",
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+
+def api_error(code, message="fake error"):
+    """Builds the error the SDK raises for an HTTP error status."""
+    error_class = errors.ClientError if code < 500 else errors.ServerError
+    status = _STATUS_NAMES.get(code, "UNKNOWN")
+    return error_class(
+        code, {"error": {"code": code, "message": message, "status": status}}
+    )
+
+
+class _FakeModels:
+    def __init__(self, outcomes):
+        self._outcomes = list(outcomes)
+        self.calls = []
+
+    def generate_content(self, **kwargs):
+        # Record the request, then return (or raise) the next scripted outcome
+        self.calls.append(kwargs)
+        if not self._outcomes:
+            raise AssertionError("fake client ran out of scripted responses")
+        outcome = self._outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+class _FakeAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content_stream(self, **kwargs):
+        # Take the next scripted outcome and stream it one part at a time
+        response = self._models.generate_content(**kwargs)
+        return _stream_parts(response)
+
+
+async def _stream_parts(response):
+    parts = response.candidates[0].content.parts
+    for index, part in enumerate(parts):
+        yield types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(content=types.Content(role="model", parts=[part]))
+            ],
+            # Usage is reported with the last chunk, as the API does
+            usage_metadata=response.usage_metadata
+            if index == len(parts) - 1
+            else None,
+        )
+
+
+class _FakeAsyncClient:
+    def __init__(self, models):
+        self.models = _FakeAsyncModels(models)
+
+
+class FakeClient:
+    """
+    A stand-in for genai.Client that serves scripted outcomes, in order, from
+    models.generate_content. Outcomes are responses or exceptions to raise;
+    every request is recorded in models.calls. aio.models.generate_content_stream
+    serves the same script, streaming each response one part per chunk.
+    """
+
+    def __init__(self, outcomes):
+        self.models = _FakeModels(outcomes)
+        self.aio = _FakeAsyncClient(self.models)
@@ -0,0 +1,150 @@
+import os
+import threading
+from collections import OrderedDict
+
+from config import CACHE_MAX_BYTES
+
+
+def stat_signature(stat_result):
+    """
+    Builds the validity signature for a cached entry from a stat result.
+
+    Args:
+        stat_result (os.stat_result): The stat of the file or directory.
+
+    Returns:
+        tuple: (mtime_ns, size, inode), which changes whenever the content does.
+    """
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def path_signature(path):
+    """Returns the stat signature of a path, or None if it doesn't exist."""
+    try:
+        return stat_signature(os.stat(path))
+    except OSError:
+        return None
+
+
+class FileCache:
+    """
+    An LRU cache for tool results derived from files and directories.
+
+    Entries are keyed on (kind, absolute path, extra arguments) and only served
+    while the (mtime_ns, size, inode) signature of the path is unchanged. The
+    least recently used entries are evicted once the cached results exceed
+    max_bytes in total.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (signature, value, size), least recently used first
+        self._entries = OrderedDict()
+        # Tools may run concurrently on the dispatcher's thread pool
+        self._lock = threading.Lock()
+
+    def get(self, kind, abs_path, signature, extra=()):
+        """
+        Looks up a cached result.
+
+        Args:
+            kind (str): The kind of result (e.g. "content" or "listing").
+            abs_path (str): The absolute path the result was derived from.
+            signature (tuple): The current stat signature of the path.
+            extra (tuple): Any other arguments the result depends on.
+
+        Returns:
+            The cached result, or None on a miss.
+        """
+        key = (kind, abs_path, extra)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                if entry is not None:
+                    # The path changed since the entry was stored
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind, abs_path, signature, value, extra=(), size=None):
+        """
+        Stores a result, evicting least recently used entries if needed.
+
+        Args:
+            kind (str): The kind of result (e.g. "content" or "listing").
+            abs_path (str): The absolute path the result was derived from.
+            signature (tuple): The stat signature of the path when it was read.
+            value: The result to cache.
+            extra (tuple): Any other arguments the result depends on.
+            size (int, optional): The size to account for the value; required
+                                  unless the value is a string.
+        """
+        if size is None:
+            size = len(value.encode("utf-8", "replace"))
+        if size > self.max_bytes:
+            return
+        key = (kind, abs_path, extra)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (signature, value, size)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, abs_path):
+        """
+        Drops every entry for a path, plus listings of the directories above it.
+
+        Args:
+            abs_path (str): The absolute path that was modified.
+        """
+        parents = set()
+        parent = os.path.dirname(abs_path)
+        while parent and parent not in parents:
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+
+        with self._lock:
+            for key in list(self._entries):
+                kind, path, _ = key
+                if path == abs_path or (kind == "listing" and path in parents):
+                    self._remove(key)
+
+    def invalidate_listings(self):
+        """Drops all directory listings (e.g. after a script may have changed files)."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == "listing":
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Returns a one-line summary of the cache's hit/miss statistics."""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"File cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), "
+            f"{len(self._entries)} entries, {self.total_bytes} bytes, {self.evictions} evictions"
+        )
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+# Shared by all tools for the lifetime of the agent process
+file_cache = FileCache()
@@ -0,0 +1,54 @@
+import contextlib
+import contextvars
+import threading
+
+# Files written by the current agent session: root -> set of absolute paths.
+# Each session runs in its own context (see session_changes) and the
+# dispatcher copies that context onto its worker threads, so concurrent
+# sessions never see or clear each other's changes.
+_session_changes = contextvars.ContextVar("session_changes", default=None)
+
+# Changes made outside any session, e.g. by calling the tools directly
+_unscoped_changes = {}
+
+_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def session_changes():
+    """
+    Tracks the files changed by the code run inside it as one session.
+
+    Nested uses join the enclosing session rather than starting a new one.
+    """
+    if _session_changes.get() is not None:
+        yield
+        return
+    token = _session_changes.set({})
+    try:
+        yield
+    finally:
+        _session_changes.reset(token)
+
+
+def _changes():
+    changes = _session_changes.get()
+    return _unscoped_changes if changes is None else changes
+
+
+def record_change(root, abs_path):
+    """Remembers that a file in the working directory `root` was changed."""
+    with _lock:
+        _changes().setdefault(root, set()).add(abs_path)
+
+
+def pending_changes(root):
+    """Returns the files changed in `root` by this session that are still pending."""
+    with _lock:
+        return set(_changes().get(root, ()))
+
+
+def clear_changes(root, abs_paths):
+    """Marks changes as handled (e.g. once the tests they affect have passed)."""
+    with _lock:
+        _changes().get(root, set()).difference_update(abs_paths)
@@ -1,45 +1,139 @@
+import mmap
 import os
+import stat
 from google.genai import types
 from config import MAX_CHARS
+from functions.cache import file_cache, stat_signature
+from functions.workspace import get_workspace
 
+# Size of the chunks used when counting lines through the memory map
+_LINE_COUNT_CHUNK = 1024 * 1024
 
-def get_file_content(working_directory, file_path):
+
+def _is_continuation_byte(byte):
+    # UTF-8 continuation bytes look like 0b10xxxxxx
+    return byte & 0xC0 == 0x80
+
+
+def _count_lines(mapped, signature, abs_file_path):
+    """
+    Counts the lines of a memory-mapped file, caching the result per file version.
+
+    Args:
+        mapped (mmap.mmap): The mapped file.
+        signature (tuple): The stat signature of the file.
+        abs_file_path (str): The absolute path of the file.
+
+    Returns:
+        int: The number of lines in the file.
+    """
+    cached = file_cache.get("lines", abs_file_path, signature)
+    if cached is not None:
+        return int(cached)
+
+    newlines = 0
+    for start in range(0, len(mapped), _LINE_COUNT_CHUNK):
+        newlines += mapped[start : start + _LINE_COUNT_CHUNK].count(b"\n")
+    # A last line without a trailing newline still counts
+    lines = newlines + (1 if len(mapped) and mapped[-1] != ord("\n") else 0)
+
+    file_cache.put("lines", abs_file_path, signature, str(lines))
+    return lines
+
+
+def get_file_content(working_directory, file_path, offset=0, length=MAX_CHARS):
     """
     Reads the content of a file within the working directory.
 
+    Large files are read through a memory map, so any byte range can be served
+    without reading or decoding the data before it.
+
     Args:
         working_directory (str): The base directory where file access is allowed.
         file_path (str): The relative path to the file to be read.
+        offset (int): Byte offset to start reading at. Negative values count
+                      back from the end of the file (default: 0).
+        length (int): Maximum number of bytes to read (default and cap: MAX_CHARS).
 
     Returns:
-        str: The file contents (up to MAX_CHARS characters) or an error message.
+        str: The requested part of the file contents or an error message. When
+             the file is not shown in full, a header with its total size and
+             line count is included so the model can page through it.
     """
 
-    # Get absolute paths for both the working directory and the target file
-    abs_working_dir = os.path.abspath(working_directory)
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+    # Resolve the target file (following symlinks) inside the working directory
+    abs_file_path = get_workspace(working_directory).resolve(file_path)
 
-    # Security check: prevent path traversal attacks
-    # Ensures the target file path is inside the allowed working directory
-    if not abs_file_path.startswith(abs_working_dir):
+    # Security check: prevent path traversal attacks and symlink escapes
+    if abs_file_path is None:
         return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
 
-    # Check if the file exists and is a regular file
-    if not os.path.isfile(abs_file_path):
+    # Check if the file exists and is a regular file (one stat serves the cache too)
+    try:
+        file_stat = os.stat(abs_file_path)
+    except OSError:
+        file_stat = None
+    if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
         return f'Error: File not found or is not a regular file: "{file_path}"'
 
+    # Validate the requested range
+    try:
+        offset = int(offset)
+        length = int(length)
+    except (TypeError, ValueError):
+        return f'Error: offset and length must be integers, got {offset!r} and {length!r}'
+    if length <= 0:
+        return f"Error: length must be positive, got {length}"
+    length = min(length, MAX_CHARS)
+    if offset > file_stat.st_size:
+        return (
+            f'Error: offset {offset} is past the end of "{file_path}" '
+            f"({file_stat.st_size} bytes)"
+        )
+
+    # Serve unchanged files from the cache
+    signature = stat_signature(file_stat)
+    cache_args = (file_path, offset, length)
+    cached = file_cache.get("content", abs_file_path, signature, cache_args)
+    if cached is not None:
+        return cached
+
     try:
-        # Open the file in read mode
-        with open(abs_file_path, "r") as f:
-            # Read up to MAX_CHARS characters
-            content = f.read(MAX_CHARS)
+        size = file_stat.st_size
+        start = max(0, size + offset) if offset < 0 else min(offset, size)
+        end = min(size, start + length)
 
-            # If the file is larger than MAX_CHARS, indicate it was truncated
-            if os.path.getsize(abs_file_path) > MAX_CHARS:
-                content += (
-                    f'[...File "{file_path}" truncated at {MAX_CHARS} characters]'
-                )
+        # Empty files cannot be memory-mapped
+        if size == 0:
+            content = ""
+        else:
+            with open(abs_file_path, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                # Move both ends onto character boundaries so nothing is split
+                while start < end and _is_continuation_byte(mapped[start]):
+                    start += 1
+                while start < end < size and _is_continuation_byte(mapped[end]):
+                    end -= 1
 
+                content = mapped[start:end].decode("utf-8", errors="replace")
+
+                # Describe the whole file when only part of it is shown
+                if start > 0 or end < size:
+                    lines = _count_lines(mapped, signature, abs_file_path)
+                    content = (
+                        f'[File "{file_path}": {size} bytes, {lines} lines; '
+                        f"showing bytes {start}-{end}]\n" + content
+                    )
+
+        # If the file continues past the range, say where to resume
+        if end < size:
+            content += (
+                f'[...File "{file_path}" truncated at byte {end} of {size}; '
+                f"read again with offset={end} to continue]"
+            )
+
+        file_cache.put("content", abs_file_path, signature, content, cache_args)
         return content
 
     except Exception as e:
@@ -50,7 +144,8 @@ def get_file_content(working_directory, file_path):
 # Define schema for the LLM so it knows how to call this function
 schema_get_file_content = types.FunctionDeclaration(
     name="get_file_content",
-    description=f"Reads and returns the first {MAX_CHARS} characters of the content from a specified file within the working directory.",
+    description=f"Reads up to {MAX_CHARS} bytes of a file within the working directory, starting at an optional byte offset. "
+    "Partial reads are prefixed with the file's total size and line count so large files can be paged through.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -58,6 +153,15 @@ schema_get_file_content = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The path to the file whose content should be read, relative to the working directory.",
             ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Byte offset to start reading at. Negative values count back from the end of the file "
+                "(e.g. -2000 reads the last 2000 bytes). Defaults to 0.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"Maximum number of bytes to read. Defaults to and is capped at {MAX_CHARS}.",
+            ),
         },
         required=["file_path"],  # file_path is required for the function to work
     ),
@@ -1,26 +1,189 @@
 import os
+from fnmatch import fnmatch
 from google.genai import types
+from config import LIST_PAGE_SIZE
+from functions.cache import file_cache, path_signature
+from functions.gitignore import is_ignored, read_gitignore
+from functions.workspace import get_workspace
 
 
-def get_files_info(working_directory, directory="."):
+def _matches_any(patterns, rel_path):
+    # Globs match either the path relative to the listed directory or the bare name
+    name = rel_path.rsplit("/", 1)[-1]
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def _file_size(abs_path):
+    try:
+        return os.stat(abs_path).st_size
+    except OSError:
+        # Broken symlinks have no target to stat
+        return os.lstat(abs_path).st_size
+
+
+def _format_entry(rel_path, file_size, is_dir):
+    return f"- {rel_path}: file_size={file_size} bytes, is_dir={is_dir}"
+
+
+def _walk(abs_working_dir, target_dir, recursive, max_depth, include, exclude):
+    """
+    Lists a directory with os.scandir, reusing each DirEntry's type and stat data.
+
+    Returns:
+        tuple: (entries, lines, dependencies). entries is a list of
+               (relative path, absolute path, is_dir) and lines the matching
+               formatted lines, both sorted by path; dependencies maps every
+               directory scanned and .gitignore file consulted to its stat
+               signature (None if it doesn't exist), so a cached listing can
+               tell when it is out of date.
+    """
+    dependencies = {}
+
+    def read_rules(abs_dir, rel_dir):
+        # Record the directory and its .gitignore, so adding, editing or
+        # removing either one invalidates the listing
+        dependencies[abs_dir] = path_signature(abs_dir)
+        gitignore = os.path.join(abs_dir, ".gitignore")
+        dependencies[gitignore] = path_signature(gitignore)
+        return read_gitignore(abs_dir, rel_dir)
+
+    # In recursive mode, honour the .gitignore files above and inside the tree
+    rules = []
+    if recursive:
+        rel_target = os.path.relpath(target_dir, abs_working_dir)
+        current, current_rel = abs_working_dir, ""
+        rules.extend(read_rules(current, current_rel))
+        if rel_target != ".":
+            for part in rel_target.split(os.sep):
+                current = os.path.join(current, part)
+                current_rel = f"{current_rel}/{part}" if current_rel else part
+                rules.extend(read_rules(current, current_rel))
+
+    files_info = []
+    # (absolute dir, path relative to the listed directory, depth, inherited rules)
+    pending = [(target_dir, "", 1, rules)]
+    while pending:
+        abs_dir, rel_dir, depth, dir_rules = pending.pop()
+        if recursive and rel_dir:
+            repo_rel = os.path.relpath(abs_dir, abs_working_dir).replace(os.sep, "/")
+            dir_rules = dir_rules + read_rules(abs_dir, repo_rel)
+        # Taken before scanning, so a change during the scan is caught next time
+        dependencies.setdefault(abs_dir, path_signature(abs_dir))
+
+        with os.scandir(abs_dir) as entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                # Don't follow directory symlinks, which could loop or leave the tree
+                is_dir = entry.is_dir(follow_symlinks=False)
+
+                if recursive:
+                    if entry.name == ".git":
+                        continue
+                    repo_rel = os.path.relpath(entry.path, abs_working_dir)
+                    if is_ignored(dir_rules, repo_rel.replace(os.sep, "/"), is_dir):
+                        continue
+                if exclude and _matches_any(exclude, rel_path):
+                    continue
+
+                if is_dir and recursive and (max_depth is None or depth < max_depth):
+                    pending.append((entry.path, rel_path, depth + 1, dir_rules))
+
+                if include and not is_dir and not _matches_any(include, rel_path):
+                    continue
+
+                # DirEntry caches its stat result, so this is at most one syscall
+                try:
+                    file_size = entry.stat().st_size
+                except OSError:
+                    # Broken symlinks have no target to stat
+                    file_size = entry.stat(follow_symlinks=False).st_size
+
+                files_info.append(
+                    (rel_path, entry.path, is_dir, _format_entry(rel_path, file_size, is_dir))
+                )
+
+    files_info.sort()
+    entries = [(rel_path, path, is_dir) for rel_path, path, is_dir, _ in files_info]
+    return entries, [line for *_, line in files_info], dependencies
+
+
+def _list(abs_working_dir, target_dir, recursive, max_depth, include, exclude):
+    """
+    Lists a directory, reusing the entries of an earlier identical listing.
+
+    A cached listing is only reused while every directory it scanned and every
+    .gitignore it consulted is unchanged, so files created, deleted or renamed
+    by anything (not just the agent's tools) show up. File sizes are not
+    cached; they are read again on every call.
+
+    Returns:
+        list[str]: One formatted line per entry, sorted by path.
+    """
+    listing_args = (
+        bool(recursive),
+        max_depth,
+        tuple(include or ()),
+        tuple(exclude or ()),
+    )
+    signature = path_signature(target_dir)
+    cached = file_cache.get("listing", target_dir, signature, listing_args)
+    if cached is not None:
+        dependencies, entries = cached
+        if all(path_signature(path) == sig for path, sig in dependencies):
+            return [
+                _format_entry(rel_path, _file_size(path), is_dir)
+                for rel_path, path, is_dir in entries
+            ]
+
+    entries, lines, dependencies = _walk(
+        abs_working_dir, target_dir, recursive, max_depth, include, exclude
+    )
+    file_cache.put(
+        "listing",
+        target_dir,
+        dependencies.get(target_dir, signature),
+        (tuple(dependencies.items()), tuple(entries)),
+        listing_args,
+        size=sum(len(line) for line in lines) + 64 * len(dependencies),
+    )
+    return lines
+
+
+def get_files_info(
+    working_directory,
+    directory=".",
+    recursive=False,
+    max_depth=None,
+    include=None,
+    exclude=None,
+    page=1,
+):
     """
     Lists files and directories inside a given directory, constrained to the working directory.
 
     Args:
         working_directory (str): The base directory where file access is allowed.
         directory (str): The relative path of the directory to list (default: current working directory).
+        recursive (bool): Whether to list subdirectories too, skipping anything
+                          matched by a .gitignore file (default: False).
+        max_depth (int, optional): How many directory levels to list in recursive mode
+                                   (1 lists only the directory itself).
+        include (list[str], optional): Glob patterns files must match to be listed.
+        exclude (list[str], optional): Glob patterns of files and directories to skip.
+        page (int): Which page of LIST_PAGE_SIZE entries to return (default: 1).
 
     Returns:
         str: A formatted string containing file names, sizes, and whether they are directories,
              or an error message if the operation fails.
     """
 
-    # Convert working directory and target directory into absolute paths
-    abs_working_dir = os.path.abspath(working_directory)
-    target_dir = os.path.abspath(os.path.join(working_directory, directory))
+    # Resolve the working directory and the target directory (following symlinks)
+    workspace = get_workspace(working_directory)
+    abs_working_dir = workspace.root
+    target_dir = workspace.resolve(directory)
 
     # Security check: ensure target_dir is inside the permitted working directory
-    if not target_dir.startswith(abs_working_dir):
+    if target_dir is None:
         return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
 
     # Validate that target_dir actually exists and is a directory
@@ -28,25 +191,33 @@ def get_files_info(working_directory, directory="."):
         return f'Error: "{directory}" is not a directory'
 
     try:
-        files_info = []
-
-        # Loop through all items in the target directory
-        for filename in os.listdir(target_dir):
-            filepath = os.path.join(target_dir, filename)
-
-            # Check if the current item is a directory
-            is_dir = os.path.isdir(filepath)
+        page = int(page)
+        max_depth = int(max_depth) if max_depth is not None else None
+    except (TypeError, ValueError):
+        return f"Error: page and max_depth must be integers, got {page!r} and {max_depth!r}"
+    if page < 1:
+        return f"Error: page must be at least 1, got {page}"
 
-            # Get file size (works for both files and directories, though size of dirs may vary by OS)
-            file_size = os.path.getsize(filepath)
-
-            # Append formatted info string for each file/directory
-            files_info.append(
-                f"- {filename}: file_size={file_size} bytes, is_dir={is_dir}"
-            )
+    try:
+        files_info = _list(
+            abs_working_dir, target_dir, recursive, max_depth, include, exclude
+        )
 
-        # Return the list joined into a single string with line breaks
-        return "\n".join(files_info)
+        # Return a single page of the listing, with a pointer to the next one
+        if len(files_info) <= LIST_PAGE_SIZE and page == 1:
+            return "\n".join(files_info)
+        # An empty listing still has one (empty) page
+        pages = max(1, -(-len(files_info) // LIST_PAGE_SIZE))
+        if page > pages:
+            return f"Error: page {page} is out of range ({pages} pages)"
+        start = (page - 1) * LIST_PAGE_SIZE
+        shown = files_info[start : start + LIST_PAGE_SIZE]
+        footer = (
+            f"[Showing entries {start + 1}-{start + len(shown)} of {len(files_info)}"
+        )
+        if start + len(shown) < len(files_info):
+            footer += f"; request page={page + 1} for more"
+        return "\n".join(shown + [footer + "]"])
 
     except Exception as e:
         # Handle unexpected errors (permissions, IO issues, etc.)
@@ -56,7 +227,8 @@ def get_files_info(working_directory, directory="."):
 # Define schema so the LLM knows how to call this function
 schema_get_files_info = types.FunctionDeclaration(
     name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
+    description="Lists files in the specified directory along with their sizes, constrained to the working directory. "
+    f"Can list whole trees recursively (skipping .gitignore'd paths), filter by glob, and pages results {LIST_PAGE_SIZE} entries at a time.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -65,6 +237,28 @@ schema_get_files_info = types.FunctionDeclaration(
                 description="The directory to list files from, relative to the working directory. "
                 "If not provided, lists files in the working directory itself.",
             ),
+            "recursive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether to also list the contents of subdirectories. Defaults to false.",
+            ),
+            "max_depth": types.Schema(
+                type=types.Type.INTEGER,
+                description="In recursive mode, how many directory levels to list (1 lists only the directory itself).",
+            ),
+            "include": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Glob patterns (e.g. '*.py') that files must match to be listed.",
+            ),
+            "exclude": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Glob patterns of files and directories to leave out.",
+            ),
+            "page": types.Schema(
+                type=types.Type.INTEGER,
+                description="Page of results to return, starting at 1.",
+            ),
         },
     ),
 )
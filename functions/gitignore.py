@@ -0,0 +1,64 @@
+import os
+from fnmatch import fnmatch
+
+
+def read_gitignore(abs_dir, rel_dir):
+    """
+    Parses the .gitignore file of a directory, if it has one.
+
+    Args:
+        abs_dir (str): Absolute path of the directory.
+        rel_dir (str): The same directory relative to the working directory ("" for the root).
+
+    Returns:
+        list[tuple]: (base, pattern, negate, dir_only, anchored) for each rule.
+    """
+    rules = []
+    try:
+        with open(os.path.join(abs_dir, ".gitignore"), "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        line = line.strip()
+        # Skip blank lines and comments
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # Patterns containing a slash are relative to the .gitignore's directory
+        anchored = "/" in line
+        rules.append((rel_dir, line.lstrip("/"), negate, dir_only, anchored))
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    """
+    Decides whether a path is ignored; the last matching rule wins, as in git.
+
+    Args:
+        rules (list[tuple]): Rules from read_gitignore, parent directories first.
+        rel_path (str): The path relative to the working directory, with "/" separators.
+        is_dir (bool): Whether the path is a directory.
+
+    Returns:
+        bool: True if the path is ignored.
+    """
+    ignored = False
+    for base, pattern, negate, dir_only, anchored in rules:
+        if dir_only and not is_dir:
+            continue
+        if base:
+            if not rel_path.startswith(base + "/"):
+                continue
+            path_from_base = rel_path[len(base) + 1 :]
+        else:
+            path_from_base = rel_path
+        subject = path_from_base if anchored else path_from_base.rsplit("/", 1)[-1]
+        if fnmatch(subject, pattern):
+            ignored = not negate
+    return ignored
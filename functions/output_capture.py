@@ -0,0 +1,133 @@
+import subprocess
+import threading
+
+# Size of each read from a child process pipe
+_READ_CHUNK = 64 * 1024
+
+
+class HeadTailBuffer:
+    """
+    Keeps the first and last bytes of a stream, up to a total byte limit.
+
+    Half of the limit holds the start of the stream and the other half its most
+    recent bytes; everything in between is counted but dropped, so memory use
+    stays bounded no matter how much a process prints.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        # Fill the head first
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if not data:
+            return
+        self.tail += data
+        # Trim in batches so each write stays amortized O(len(data))
+        if len(self.tail) > 2 * self.tail_limit:
+            del self.tail[: -self.tail_limit]
+
+    @property
+    def dropped(self):
+        """Number of bytes that were discarded from the middle of the stream."""
+        return max(0, self.total - self.limit)
+
+    @property
+    def exceeded(self):
+        return self.total > self.limit
+
+    def getvalue(self):
+        """Returns the kept output as text, marking where bytes were dropped."""
+        tail = bytes(self.tail[-self.tail_limit :]) if self.tail_limit else b""
+        if not self.dropped:
+            return (bytes(self.head) + tail).decode("utf-8", errors="replace")
+        return (
+            bytes(self.head).decode("utf-8", errors="replace")
+            + f"\n[...{self.dropped} bytes of output dropped...]\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+
+class CapturedProcess(subprocess.CompletedProcess):
+    """A CompletedProcess that also records how much output was dropped."""
+
+    def __init__(self, args, returncode, stdout, stderr, dropped=0, killed=False):
+        super().__init__(args, returncode, stdout, stderr)
+        self.dropped = dropped
+        # Whether the process was killed for exceeding the output limit
+        self.killed = killed
+
+
+def run_captured(commands, cwd, timeout, limit, kill_on_limit=False):
+    """
+    Runs a command, reading its output incrementally into bounded buffers.
+
+    Args:
+        commands (list[str]): The command line to run.
+        cwd (str): The directory to run it in.
+        timeout (float): Seconds before the process is killed.
+        limit (int): Maximum bytes kept per stream (head and tail halves).
+        kill_on_limit (bool): Whether to kill the process once either stream
+                              exceeds the limit.
+
+    Returns:
+        CapturedProcess: The return code and (possibly truncated) output.
+
+    Raises:
+        subprocess.TimeoutExpired: If the process ran longer than timeout.
+    """
+    process = subprocess.Popen(
+        commands,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+    )
+    buffers = (HeadTailBuffer(limit), HeadTailBuffer(limit))
+    killed = threading.Event()
+
+    def drain(pipe, buffer):
+        # Read until EOF, killing the process if it floods the buffer
+        with pipe:
+            for chunk in iter(lambda: pipe.read1(_READ_CHUNK), b""):
+                buffer.write(chunk)
+                if kill_on_limit and buffer.exceeded and not killed.is_set():
+                    killed.set()
+                    process.kill()
+
+    readers = [
+        threading.Thread(target=drain, args=(pipe, buffer), daemon=True)
+        for pipe, buffer in zip((process.stdout, process.stderr), buffers)
+    ]
+    for reader in readers:
+        reader.start()
+
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        # Grandchildren may keep the pipes open, so don't wait on them forever
+        for reader in readers:
+            reader.join(timeout=5)
+
+    stdout, stderr = buffers
+    return CapturedProcess(
+        commands,
+        returncode,
+        stdout.getvalue(),
+        stderr.getvalue(),
+        dropped=stdout.dropped + stderr.dropped,
+        killed=killed.is_set(),
+    )
@@ -0,0 +1,258 @@
+import os
+import re
+from google.genai import types
+from functions.workspace import get_workspace
+from functions.write_file_content import save_file
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_SEARCH_MARKER = "<<<<<<< SEARCH"
+_DIVIDER = "======="
+_REPLACE_MARKER = ">>>>>>> REPLACE"
+
+
+class PatchError(Exception):
+    """Raised when a patch is malformed or does not match the file."""
+
+
+def _parse_search_replace(patch):
+    """
+    Parses search/replace blocks.
+
+    Returns:
+        list[tuple[str, str]]: (search text, replacement text) for each block.
+    """
+    blocks = []
+    lines = patch.splitlines(keepends=True)
+    i = 0
+    while i < len(lines):
+        if lines[i].rstrip("\r\n") != _SEARCH_MARKER:
+            i += 1
+            continue
+        search, replace = [], []
+        i += 1
+        while i < len(lines) and lines[i].rstrip("\r\n") != _DIVIDER:
+            search.append(lines[i])
+            i += 1
+        i += 1
+        while i < len(lines) and lines[i].rstrip("\r\n") != _REPLACE_MARKER:
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PatchError(
+                f'search/replace block {len(blocks) + 1} is missing "{_REPLACE_MARKER}"'
+            )
+        i += 1
+        blocks.append(("".join(search), "".join(replace)))
+    return blocks
+
+
+def _apply_search_replace(content, blocks):
+    for number, (search, replace) in enumerate(blocks, start=1):
+        if not search:
+            raise PatchError(
+                f"search/replace block {number} has an empty SEARCH section"
+            )
+        count = content.count(search)
+        if count == 0:
+            raise PatchError(f"SEARCH text of block {number} was not found in the file")
+        if count > 1:
+            raise PatchError(
+                f"SEARCH text of block {number} matches {count} places; include more context"
+            )
+        content = content.replace(search, replace, 1)
+    return content
+
+
+def _parse_unified_diff(patch):
+    """
+    Parses the hunks of a unified diff.
+
+    Returns:
+        list[tuple[int, list[str], list[str]]]: (old start line, old lines, new lines).
+    """
+    hunks = []
+    current = None
+    previous = None
+    # Old and new lines the current hunk's header says are still to come
+    old_left = new_left = 0
+    for line in patch.splitlines(keepends=True):
+        match = _HUNK_HEADER.match(line)
+        if match:
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+            previous = None
+            # A count left out of the header means one line
+            old_left = int(match.group(2) or 1)
+            new_left = int(match.group(4) or 1)
+            continue
+        hunk_open = old_left > 0 or new_left > 0
+        # File headers (and anything before the first hunk) carry no edits; inside
+        # a hunk, "----" removes a "---" line and "+++x" adds a "++x" line
+        if current is None or (not hunk_open and line.startswith(("---", "+++"))):
+            continue
+        old_lines, new_lines = current[1], current[2]
+        if line.startswith("\\"):
+            # "\ No newline at end of file" applies to the previous line
+            targets = {
+                " ": (old_lines, new_lines),
+                "-": (old_lines,),
+                "+": (new_lines,),
+            }
+            for target in targets.get(previous, ()):
+                target[-1] = target[-1].rstrip("\r\n")
+            continue
+        if line in ("\n", "\r\n"):
+            # Some tools strip the leading space of blank context lines
+            line = " " + line
+        marker, text = line[:1], line[1:]
+        if marker == " ":
+            old_lines.append(text)
+            new_lines.append(text)
+            old_left -= 1
+            new_left -= 1
+        elif marker == "-":
+            old_lines.append(text)
+            old_left -= 1
+        elif marker == "+":
+            new_lines.append(text)
+            new_left -= 1
+        else:
+            raise PatchError(f"unexpected line in diff hunk: {line.rstrip()!r}")
+        previous = marker
+    return hunks
+
+
+def _with_newline(text, newline):
+    # Patches are usually written with "\n"; give their lines the file's endings
+    if newline == "\n":
+        return text
+    return text.replace("\r\n", "\n").replace("\n", newline)
+
+
+def _apply_unified_diff(content, hunks, newline):
+    lines = content.splitlines(keepends=True)
+    # Lines added or removed by earlier hunks shift the later ones
+    shift = 0
+    for number, (old_start, old_lines, new_lines) in enumerate(hunks, start=1):
+        size = len(old_lines)
+        # Pure insertions ("@@ -3,0 ...") name the line they go after, not before
+        expected = (old_start if size == 0 else max(old_start - 1, 0)) + shift
+
+        def matches(at):
+            return [line.rstrip("\r\n") for line in lines[at : at + size]] == [
+                line.rstrip("\r\n") for line in old_lines
+            ]
+
+        if matches(expected):
+            position = expected
+        else:
+            # Fall back to the one place in the file the context matches
+            positions = [at for at in range(len(lines) - size + 1) if matches(at)]
+            if not positions:
+                raise PatchError(f"hunk {number} does not match the file content")
+            if len(positions) > 1:
+                raise PatchError(
+                    f"hunk {number} does not match at line {old_start} and matches "
+                    f"{len(positions)} other places; include more context"
+                )
+            position = positions[0]
+
+        lines[position : position + size] = [
+            _with_newline(line, newline) for line in new_lines
+        ]
+        shift += (position - expected) + len(new_lines) - size
+    return "".join(lines)
+
+
+def apply_patch_text(content, patch):
+    """
+    Applies search/replace blocks or a unified diff to a string.
+
+    Args:
+        content (str): The original text.
+        patch (str): The patch to apply.
+
+    Returns:
+        str: The patched text.
+
+    Raises:
+        PatchError: If the patch is malformed or its context does not match.
+    """
+    # Edited lines take the line ending the file already uses
+    newline = "\r\n" if "\r\n" in content else "\n"
+    if _SEARCH_MARKER in patch:
+        blocks = [
+            (_with_newline(search, newline), _with_newline(replace, newline))
+            for search, replace in _parse_search_replace(patch)
+        ]
+        return _apply_search_replace(content, blocks)
+    hunks = _parse_unified_diff(patch)
+    if not hunks:
+        raise PatchError("patch contains no unified diff hunks or SEARCH/REPLACE blocks")
+    return _apply_unified_diff(content, hunks, newline)
+
+
+def patch_file(working_directory, file_path, patch):
+    """
+    Edits a file in place by applying a patch, without rewriting it by hand.
+
+    Args:
+        working_directory (str): The base directory where file access is allowed.
+        file_path (str): The relative path to the file to be patched.
+        patch (str): Either a unified diff or one or more search/replace blocks.
+
+    Returns:
+        str: A success message or an error message.
+    """
+    # Resolve the target file (following symlinks) inside the working directory
+    abs_file_path = get_workspace(working_directory).resolve(file_path)
+
+    # Security check: prevent patching outside the working directory
+    if abs_file_path is None:
+        return f'Error: Cannot patch "{file_path}" as it is outside the permitted working directory'
+
+    # Only existing regular files can be patched
+    if not os.path.isfile(abs_file_path):
+        return f'Error: File not found or is not a regular file: "{file_path}"'
+
+    try:
+        # Keep line endings exactly as they are in the file
+        with open(abs_file_path, "r", newline="") as f:
+            content = f.read()
+
+        patched = apply_patch_text(content, patch)
+        if patched == content:
+            return f'Patch made no changes to "{file_path}"'
+
+        save_file(working_directory, abs_file_path, patched, newline="")
+        return f'Successfully patched "{file_path}" ({len(patched)} characters now)'
+
+    except PatchError as e:
+        return f'Error: Could not apply patch to "{file_path}": {e}'
+    except Exception as e:
+        # Catch unexpected errors (e.g., permission issues) and return them
+        return f'Error patching file "{file_path}": {e}'
+
+
+# Define schema so the LLM knows how to call this function
+schema_patch_file = types.FunctionDeclaration(
+    name="patch_file",
+    description="Edits an existing file within the working directory by applying a patch, which is much cheaper than rewriting "
+    "the whole file with write_file. The patch is either a unified diff, or one or more blocks of the form\n"
+    f"{_SEARCH_MARKER}\n<exact lines to find>\n{_DIVIDER}\n<lines to replace them with>\n{_REPLACE_MARKER}\n"
+    "The text to find must match the file exactly and only once. The file is replaced atomically.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="Path to the file to patch, relative to the working directory.",
+            ),
+            "patch": types.Schema(
+                type=types.Type.STRING,
+                description="A unified diff or SEARCH/REPLACE blocks describing the edit.",
+            ),
+        },
+        required=["file_path", "patch"],
+    ),
+)
@@ -0,0 +1,167 @@
+import atexit
+import json
+import os
+import queue
+import select
+import subprocess
+import threading
+
+import config
+from functions.output_capture import CapturedProcess
+
+# The standalone worker script each pooled interpreter runs
+_WORKER_SCRIPT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "python_worker.py"
+)
+
+# Extra seconds to wait for a worker's reply beyond the script's own timeout
+_REPLY_GRACE = 5
+
+
+class _Worker:
+    """A single pre-warmed interpreter serving run requests over its stdin/stdout."""
+
+    def __init__(self, preload):
+        self.process = subprocess.Popen(
+            ["python", _WORKER_SCRIPT, *preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, payload, timeout):
+        # Send one request and wait for its single-line reply
+        self.process.stdin.write(json.dumps(payload) + "\n")
+        self.process.stdin.flush()
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise TimeoutError("python worker did not reply")
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("python worker exited unexpectedly")
+        return json.loads(line)
+
+    def close(self):
+        if self.alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class PythonWorkerPool:
+    """
+    A pool of pre-started Python interpreters that run scripts in forked children.
+
+    Each worker imports the PYTHON_POOL_PRELOAD modules once; every script then
+    runs in a fresh fork of a warm worker, which skips interpreter startup and
+    the preloaded imports while keeping runs isolated from each other.
+    """
+
+    def __init__(self, size=None, preload=None):
+        # Read the config now rather than at import time, so changes to it apply
+        size = config.PYTHON_POOL_SIZE if size is None else size
+        if size < 1:
+            # run() would wait forever for a worker that never becomes idle
+            raise ValueError(f"a worker pool needs at least one worker, got {size}")
+        self.preload = list(config.PYTHON_POOL_PRELOAD if preload is None else preload)
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        # Start every worker up front so the first run is already warm
+        for _ in range(size):
+            self._idle.put(self._start_worker())
+
+    def _start_worker(self):
+        worker = _Worker(self.preload)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _replace_worker(self, worker):
+        worker.close()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        return self._start_worker()
+
+    def run(self, commands, cwd, timeout, limit, kill_on_limit=False):
+        """
+        Runs a Python script on an idle worker.
+
+        Args:
+            commands (list[str]): ["python", script path, *arguments], as for subprocess.
+            cwd (str): The directory to run the script in.
+            timeout (float): Seconds before the script is killed.
+            limit (int): Maximum bytes of output kept per stream (head and tail halves).
+            kill_on_limit (bool): Whether to kill the script once either stream
+                                  exceeds the limit.
+
+        Returns:
+            CapturedProcess: The script's return code and (possibly truncated) output.
+
+        Raises:
+            subprocess.TimeoutExpired: If the script ran longer than timeout.
+        """
+        worker = self._idle.get()
+        try:
+            if not worker.alive():
+                worker = self._replace_worker(worker)
+            payload = {
+                "file": commands[1],
+                "args": commands[2:],
+                "cwd": cwd,
+                "timeout": timeout,
+                "limit": limit,
+                "kill_on_limit": kill_on_limit,
+            }
+            reply = worker.request(payload, timeout + _REPLY_GRACE)
+        except Exception:
+            # Never hand a worker in an unknown state to the next run
+            worker = self._replace_worker(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+        if reply["timeout"]:
+            raise subprocess.TimeoutExpired(commands, timeout)
+        return CapturedProcess(
+            commands,
+            reply["returncode"],
+            reply["stdout"],
+            reply["stderr"],
+            dropped=reply["dropped"],
+            killed=reply["killed"],
+        )
+
+    def close(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_python_pool():
+    """
+    Returns the shared worker pool, starting it on first use.
+
+    Returns:
+        PythonWorkerPool | None: The pool, or None if it is disabled
+                                 (PYTHON_POOL_SIZE is 0) or the platform cannot fork.
+    """
+    global _pool
+    if config.PYTHON_POOL_SIZE <= 0 or not hasattr(os, "fork"):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = PythonWorkerPool()
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,199 @@
+# python_worker.py
+#
+# A pre-warmed worker for run_python_file. It is started once as its own
+# interpreter (see functions/python_pool.py), imports the modules it is told to
+# preload, and then serves one JSON request per line on stdin: each script runs
+# in a freshly forked child, so nothing it does leaks into the next run.
+#
+# This file is executed as a standalone script and must not import anything
+# from the agent itself.
+
+import json
+import os
+import runpy
+import select
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+
+def run_child(request, stdout_fd, stderr_fd):
+    """Runs the requested script in the forked child. Never returns."""
+    code = 0
+    try:
+        # Put the child in its own process group so a timeout kills everything it started
+        os.setpgid(0, 0)
+
+        # Redirect the standard streams to the capture files
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+
+        # Mirror what `python script.py args...` would set up
+        os.chdir(request["cwd"])
+        sys.argv = [request["file"]] + list(request.get("args") or [])
+        sys.path[0] = os.path.dirname(request["file"])
+
+        runpy.run_path(request["file"], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        # Hide the worker's own frames, as if the script had been run directly
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != request["file"]:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code & 0xFF)
+
+
+def wait_for_child(pid, timeout, over_limit=None):
+    """
+    Waits for the child to exit, killing it once the timeout has passed.
+
+    Args:
+        pid (int): The forked child.
+        timeout (float): Seconds before the child is killed.
+        over_limit (callable, optional): Polled while waiting; the child is
+                                         killed as soon as it returns True.
+
+    Returns:
+        tuple: (exit code or None on timeout, whether it was killed by over_limit).
+    """
+    deadline = time.monotonic() + timeout
+
+    # pidfd lets us sleep until the child exits instead of polling
+    pidfd = None
+    if hasattr(os, "pidfd_open"):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except OSError:
+            pidfd = None
+
+    try:
+        while True:
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if finished:
+                return os.waitstatus_to_exitcode(status), False
+            if over_limit is not None and over_limit():
+                os.killpg(pid, signal.SIGKILL)
+                _, status = os.waitpid(pid, 0)
+                return os.waitstatus_to_exitcode(status), True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                os.killpg(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return None, False
+            # Wake up regularly to check the output size when a limit is enforced
+            if over_limit is not None:
+                remaining = min(remaining, 0.05)
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.005))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+
+def read_exactly(fd, offset, size):
+    os.lseek(fd, offset, os.SEEK_SET)
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, min(size, 1024 * 1024))
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_capture(fd, limit):
+    """
+    Reads a capture file, keeping only its first and last bytes up to limit.
+
+    Returns:
+        tuple: (text, number of bytes dropped from the middle)
+    """
+    size = os.fstat(fd).st_size
+    try:
+        if size <= limit:
+            return read_exactly(fd, 0, size).decode("utf-8", errors="replace"), 0
+        head_size = limit // 2
+        tail_size = limit - head_size
+        dropped = size - limit
+        text = (
+            read_exactly(fd, 0, head_size).decode("utf-8", errors="replace")
+            + f"\n[...{dropped} bytes of output dropped...]\n"
+            + read_exactly(fd, size - tail_size, tail_size).decode(
+                "utf-8", errors="replace"
+            )
+        )
+        return text, dropped
+    finally:
+        os.close(fd)
+
+
+def serve():
+    # Import the requested modules once, so every forked run starts warm
+    for module in sys.argv[1:]:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+    protocol_out = sys.stdout
+    for line in sys.stdin:
+        request = json.loads(line)
+
+        # Unlinked temporary files hold the output until the child exits
+        stdout_fd, stdout_path = tempfile.mkstemp()
+        stderr_fd, stderr_path = tempfile.mkstemp()
+        os.unlink(stdout_path)
+        os.unlink(stderr_path)
+
+        protocol_out.flush()
+        pid = os.fork()
+        if pid == 0:
+            run_child(request, stdout_fd, stderr_fd)
+
+        limit = request["limit"]
+        over_limit = None
+        if request.get("kill_on_limit"):
+            def over_limit():
+                return (
+                    os.fstat(stdout_fd).st_size > limit
+                    or os.fstat(stderr_fd).st_size > limit
+                )
+
+        returncode, killed = wait_for_child(pid, request["timeout"], over_limit)
+        stdout, stdout_dropped = read_capture(stdout_fd, limit)
+        stderr, stderr_dropped = read_capture(stderr_fd, limit)
+        reply = {
+            "returncode": returncode,
+            "timeout": returncode is None,
+            "killed": killed,
+            "dropped": stdout_dropped + stderr_dropped,
+            "stdout": stdout,
+            "stderr": stderr,
+        }
+        protocol_out.write(json.dumps(reply) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -1,6 +1,11 @@
 import os
-import subprocess
 from google.genai import types
+from config import KILL_ON_OUTPUT_LIMIT, MAX_OUTPUT_BYTES
+from functions.cache import file_cache
+from functions.output_capture import run_captured
+from functions.python_pool import get_python_pool
+from functions.workspace import get_workspace
+from tracing import tracer
 
 
 def run_python_file(working_directory, file_path, args=None):
@@ -13,24 +18,41 @@ def run_python_file(working_directory, file_path, args=None):
         args (list, optional): Extra command-line arguments to pass to the Python file.
 
     Returns:
-        str: The captured output (stdout and/or stderr), or an error message if execution fails.
+        str: The captured output (stdout and/or stderr, each limited to the first and
+             last MAX_OUTPUT_BYTES), or an error message if execution fails.
     """
+    output, _ = run_python(working_directory, file_path, args)
+    return output
 
-    # Convert working directory and file path into absolute paths
-    abs_working_dir = os.path.abspath(working_directory)
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+
+def run_python(working_directory, file_path, args=None):
+    """
+    Executes a Python file like run_python_file, also returning its exit code.
+
+    Returns:
+        tuple: (output, exit code). The exit code is None if the file could
+               not be run at all (the output is then an error message).
+    """
+
+    # Resolve the working directory and the script (following symlinks)
+    workspace = get_workspace(working_directory)
+    abs_working_dir = workspace.root
+    abs_file_path = workspace.resolve(file_path)
 
     # Security check: ensure file path stays inside the working directory
-    if not abs_file_path.startswith(abs_working_dir):
-        return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
+    if abs_file_path is None:
+        return (
+            f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory',
+            None,
+        )
 
     # Ensure file exists
     if not os.path.exists(abs_file_path):
-        return f'Error: File "{file_path}" not found.'
+        return f'Error: File "{file_path}" not found.', None
 
     # Only allow Python files
     if not file_path.endswith(".py"):
-        return f'Error: "{file_path}" is not a Python file.'
+        return f'Error: "{file_path}" is not a Python file.', None
 
     try:
         # Build the command to execute the Python file
@@ -38,14 +60,33 @@ def run_python_file(working_directory, file_path, args=None):
         if args:
             commands.extend(args)  # Add optional arguments if provided
 
-        # Run the subprocess, capturing stdout and stderr with a timeout
-        result = subprocess.run(
-            commands,
-            capture_output=True,
-            text=True,
-            timeout=30,  # Prevent infinite loops or hangs
-            cwd=abs_working_dir,  # Ensure execution happens in working directory
-        )
+        # Prefer a pre-warmed worker when the pool is enabled
+        pool = get_python_pool()
+        with tracer.span("subprocess", script=file_path, pooled=bool(pool)) as span:
+            if pool:
+                result = pool.run(
+                    commands,
+                    cwd=abs_working_dir,
+                    timeout=30,
+                    limit=MAX_OUTPUT_BYTES,
+                    kill_on_limit=KILL_ON_OUTPUT_LIMIT,
+                )
+            else:
+                # Run the subprocess, streaming stdout and stderr into bounded buffers
+                result = run_captured(
+                    commands,
+                    cwd=abs_working_dir,  # Ensure execution happens in working directory
+                    timeout=30,  # Prevent infinite loops or hangs
+                    limit=MAX_OUTPUT_BYTES,  # Keep only the head and tail of huge outputs
+                    kill_on_limit=KILL_ON_OUTPUT_LIMIT,
+                )
+            span.set(
+                exit_code=result.returncode,
+                stdout_chars=len(result.stdout or ""),
+                stderr_chars=len(result.stderr or ""),
+                dropped_bytes=result.dropped,
+                killed=result.killed,
+            )
 
         output = []
 
@@ -57,16 +98,29 @@ def run_python_file(working_directory, file_path, args=None):
         if result.stderr:
             output.append(f"STDERR:\n{result.stderr}")
 
+        # Say how much output was left out so the model knows it is incomplete
+        if result.killed:
+            output.append(
+                f"Process was killed after exceeding the {MAX_OUTPUT_BYTES}-byte output limit"
+            )
+        if result.dropped:
+            output.append(f"{result.dropped} bytes of output were dropped")
+
         # Append return code if non-zero (indicates errors)
         if result.returncode != 0:
             output.append(f"Process exited with code {result.returncode}")
 
         # Return combined output, or fallback if nothing was produced
-        return "\n".join(output) if output else "No output produced."
+        output = "\n".join(output) if output else "No output produced."
+        return output, result.returncode
 
     except Exception as e:
         # Handle unexpected subprocess or OS-level errors
-        return f"Error: executing Python file: {e}"
+        return f"Error: executing Python file: {e}", None
+
+    finally:
+        # The script may have created or resized files, so listings are stale
+        file_cache.invalidate_listings()
 
 
 # Define schema so the LLM knows how to call this function
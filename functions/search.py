@@ -0,0 +1,417 @@
+import ast
+import os
+import re
+from fnmatch import fnmatch
+from google.genai import types
+from functions.workspace import SKIP_DIRS, WorkspaceIndex, WorkspaceIndexes
+
+# Files larger than this (or containing NUL bytes) are not indexed
+_MAX_FILE_BYTES = 1024 * 1024
+
+# Characters of a matching line shown in search results
+_MAX_LINE_CHARS = 200
+
+
+def _trigrams(text):
+    # Every 3-character substring, case-folded so one index serves both case modes
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _skip_group(pattern, i):
+    # Returns the index just past the group or character class starting at pattern[i]
+    closing = ")" if pattern[i] == "(" else "]"
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            i += 2
+            continue
+        if closing == ")" and c == "(":
+            depth += 1
+        elif c == closing:
+            depth -= 1
+            if depth <= 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def required_literals(pattern):
+    """
+    Finds literal strings every match of a regular expression must contain.
+
+    Conservative: alternations, groups, character classes and optional
+    characters are never counted as required.
+
+    Args:
+        pattern (str): The regular expression.
+
+    Returns:
+        list[str]: Literal runs that appear in every match (possibly none).
+    """
+    if "|" in pattern:
+        return []
+    runs = []
+    current = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        literal = None
+        if c == "\\" and i + 1 < len(pattern):
+            # Escaped punctuation is literal; \d, \w, \b and friends are not
+            if not pattern[i + 1].isalnum():
+                literal = pattern[i + 1]
+            i += 2
+        elif c in "([":
+            i = _skip_group(pattern, i)
+        elif c in "*?{":
+            # The previous character was optional after all
+            current = current[:-1]
+            if c == "{":
+                i = pattern.find("}", i) + 1 or len(pattern)
+            else:
+                i += 1
+        elif c in ".^$+)]":
+            i += 1
+        else:
+            literal = c
+            i += 1
+
+        if literal is not None:
+            current += literal
+        else:
+            runs.append(current)
+            current = ""
+    runs.append(current)
+    return [run for run in runs if run]
+
+
+def _definitions(tree):
+    """
+    Lists the classes, functions and methods defined in a module, at any depth.
+
+    Returns:
+        list[tuple]: (qualified name, kind, line number) per definition.
+    """
+    found = []
+    pending = [(node, "", False) for node in tree.body]
+    while pending:
+        node, prefix, in_class = pending.pop()
+        if isinstance(node, ast.ClassDef):
+            kind = "class"
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            kind = "method" if in_class else "function"
+        else:
+            continue
+        name = f"{prefix}{node.name}"
+        found.append((name, kind, node.lineno))
+        for child in node.body:
+            pending.append((child, f"{name}.", kind == "class"))
+    found.sort(key=lambda definition: definition[2])
+    return found
+
+
+class CodeIndex(WorkspaceIndex):
+    """
+    A searchable index of the text files in a working directory: a trigram
+    index narrowing text searches down to candidate files, and the
+    definitions (classes, functions, methods) of every Python file.
+
+    Each file is re-indexed only when its (mtime_ns, size) changes, so keeping
+    the index current after an edit costs one read (and one parse). Files
+    that resolve outside the working directory (through a symlink) are never
+    read.
+    """
+
+    def __init__(self, working_directory):
+        super().__init__(working_directory)
+        # abs path -> ((mtime_ns, size), lines, trigrams, definitions)
+        self._files = {}
+        # trigram -> set of abs paths containing it
+        self._trigrams = {}
+
+    def _wants_dir(self, name):
+        return name not in SKIP_DIRS and not name.startswith(".")
+
+    def _forget(self, abs_path):
+        # Caller must hold the lock
+        entry = self._files.pop(abs_path, None)
+        if entry is None:
+            return
+        for trigram in entry[2]:
+            paths = self._trigrams.get(trigram)
+            if paths is not None:
+                paths.discard(abs_path)
+                if not paths:
+                    del self._trigrams[trigram]
+
+    def update(self, abs_path):
+        """
+        Re-indexes a single file if it changed since it was last indexed.
+
+        Args:
+            abs_path (str): Absolute path of the file.
+        """
+        stale = self._stale(abs_path)
+        if stale is None:
+            return
+        real_path, signature = stale
+
+        text = self._read_text(real_path, signature[1])
+        if text is None:
+            with self._lock:
+                self._forget(abs_path)
+            return
+        lines = text.splitlines()
+        trigrams = _trigrams(text)
+        definitions = []
+        if abs_path.endswith(".py"):
+            try:
+                definitions = _definitions(ast.parse(text, filename=abs_path))
+            except (SyntaxError, ValueError):
+                # Files that don't parse yet can still be searched as text
+                pass
+
+        with self._lock:
+            self._forget(abs_path)
+            self._files[abs_path] = (signature, lines, trigrams, definitions)
+            for trigram in trigrams:
+                self._trigrams.setdefault(trigram, set()).add(abs_path)
+
+    def _read_text(self, abs_path, size):
+        if size > _MAX_FILE_BYTES:
+            return None
+        try:
+            with open(abs_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        # Binary files are not worth searching
+        if b"\0" in data:
+            return None
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    def search(self, pattern, literals, include=None):
+        """
+        Finds the lines matching a compiled regular expression.
+
+        Args:
+            pattern (re.Pattern): The expression to match against each line.
+            literals (list[str]): Strings every match contains, used to skip
+                                  files that cannot match.
+            include (list[str], optional): Glob patterns of files to search.
+
+        Returns:
+            list[tuple[str, int, str]]: (relative path, line number, line) per match.
+        """
+        with self._lock:
+            candidates = None
+            for literal in literals:
+                for trigram in _trigrams(literal):
+                    paths = self._trigrams.get(trigram, set())
+                    candidates = paths if candidates is None else candidates & paths
+            if candidates is None:
+                candidates = set(self._files)
+            files = [(path, self._files[path][1]) for path in candidates]
+
+        matches = []
+        for path, lines in sorted(files):
+            rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+            if include and not any(
+                fnmatch(rel_path, glob) or fnmatch(os.path.basename(rel_path), glob)
+                for glob in include
+            ):
+                continue
+            for number, line in enumerate(lines, start=1):
+                if pattern.search(line):
+                    matches.append((rel_path, number, line))
+        return matches
+
+    def find(self, name):
+        """
+        Finds definitions by name: an exact qualified name (e.g.
+        "Calculator._apply_operator"), a bare name, or failing those, any
+        qualified name containing it (case-insensitive).
+
+        Returns:
+            list[tuple[str, int, str, str, str]]: (relative path, line number,
+                kind, qualified name, definition line) per match.
+        """
+        with self._lock:
+            files = [(path, entry[1], entry[3]) for path, entry in self._files.items()]
+
+        exact, partial = [], []
+        lowered = name.lower()
+        for path, lines, definitions in sorted(files):
+            rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+            for qualified_name, kind, line_number in definitions:
+                found = (
+                    rel_path,
+                    line_number,
+                    kind,
+                    qualified_name,
+                    lines[line_number - 1].strip() if line_number <= len(lines) else "",
+                )
+                if qualified_name == name or qualified_name.rsplit(".", 1)[-1] == name:
+                    exact.append(found)
+                elif lowered in qualified_name.lower():
+                    partial.append(found)
+        return exact or partial
+
+
+_indexes = WorkspaceIndexes(CodeIndex)
+
+
+def get_code_index(working_directory):
+    """Returns the (refreshed) code index for a working directory."""
+    return _indexes.get(working_directory)
+
+
+def update_code_index(working_directory, abs_file_path):
+    """
+    Re-indexes a written file, if the working directory has been indexed.
+
+    Args:
+        working_directory (str): The working directory the write happened in.
+        abs_file_path (str): Absolute path of the written file.
+    """
+    index = _indexes.existing(working_directory)
+    if index is not None:
+        index.update(abs_file_path)
+
+
+def search_code(
+    working_directory,
+    query,
+    regex=False,
+    case_sensitive=False,
+    include=None,
+    max_results=50,
+):
+    """
+    Searches the text files of the working directory, line by line.
+
+    Args:
+        working_directory (str): The base directory where file access is allowed.
+        query (str): The text (or regular expression) to look for.
+        regex (bool): Whether the query is a regular expression.
+        case_sensitive (bool): Whether matching is case-sensitive (default: False).
+        include (list[str], optional): Glob patterns of files to search (e.g. "*.py").
+        max_results (int): Maximum number of matching lines to return.
+
+    Returns:
+        str: One "path:line: text" entry per match, or an error message.
+    """
+    if not query:
+        return "Error: query must not be empty"
+    try:
+        max_results = int(max_results)
+    except (TypeError, ValueError):
+        return f"Error: max_results must be an integer, got {max_results!r}"
+
+    flags = 0 if case_sensitive else re.IGNORECASE
+    try:
+        pattern = re.compile(query if regex else re.escape(query), flags)
+    except re.error as e:
+        return f'Error: invalid regular expression "{query}": {e}'
+    literals = required_literals(query) if regex else [query]
+
+    try:
+        matches = get_code_index(working_directory).search(pattern, literals, include)
+    except Exception as e:
+        return f"Error searching code: {e}"
+
+    if not matches:
+        return f'No matches for "{query}".'
+    lines = [
+        f"{path}:{number}: {line.strip()[:_MAX_LINE_CHARS]}"
+        for path, number, line in matches[:max_results]
+    ]
+    if len(matches) > max_results:
+        lines.append(
+            f"[{len(matches) - max_results} more matches; narrow the query or use include]"
+        )
+    return "\n".join(lines)
+
+
+def find_symbol(working_directory, name):
+    """
+    Finds where classes, functions and methods are defined in the working directory's Python files.
+
+    Args:
+        working_directory (str): The base directory where file access is allowed.
+        name (str): A qualified name (e.g. "Calculator._apply_operator") or a bare name.
+
+    Returns:
+        str: One "path:line: kind name: definition" entry per match, or a message
+             saying nothing was found.
+    """
+    if not name:
+        return "Error: name must not be empty"
+    try:
+        found = get_code_index(working_directory).find(name)
+    except Exception as e:
+        return f"Error finding symbol: {e}"
+
+    if not found:
+        return f'No definition found for "{name}".'
+    return "\n".join(
+        f"{path}:{number}: {kind} {qualified_name}: {line}"
+        for path, number, kind, qualified_name, line in found
+    )
+
+
+# Define schemas so the LLM knows how to call these functions
+schema_search_code = types.FunctionDeclaration(
+    name="search_code",
+    description="Searches every text file in the working directory for a string or regular expression "
+    "and returns the matching lines as path:line: text. Much faster than reading files to find something.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "query": types.Schema(
+                type=types.Type.STRING,
+                description="The text to search for (or a regular expression if regex is true).",
+            ),
+            "regex": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether the query is a Python regular expression. Defaults to false.",
+            ),
+            "case_sensitive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether matching is case-sensitive. Defaults to false.",
+            ),
+            "include": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Glob patterns (e.g. '*.py') of files to search.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description="Maximum number of matching lines to return. Defaults to 50.",
+            ),
+        },
+        required=["query"],
+    ),
+)
+
+schema_find_symbol = types.FunctionDeclaration(
+    name="find_symbol",
+    description="Finds where a class, function or method is defined in the working directory's Python files, "
+    "returning the file, line number and definition line.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "name": types.Schema(
+                type=types.Type.STRING,
+                description="The name to look up, bare (e.g. '_apply_operator') or qualified "
+                "(e.g. 'Calculator._apply_operator').",
+            ),
+        },
+        required=["name"],
+    ),
+)
@@ -0,0 +1,226 @@
+import ast
+import os
+from fnmatch import fnmatch
+from google.genai import types
+from functions.changes import clear_changes, pending_changes, record_change
+from functions.run_python import run_python
+from functions.workspace import WorkspaceIndex, WorkspaceIndexes, get_workspace
+
+# File names that are treated as test scripts
+TEST_FILE_PATTERNS = ("test_*.py", "*_test.py", "tests.py")
+
+
+def _is_test_file(path):
+    name = os.path.basename(path)
+    return any(fnmatch(name, pattern) for pattern in TEST_FILE_PATTERNS)
+
+
+class ImportIndex(WorkspaceIndex):
+    """
+    An import-dependency graph of the Python files in a working directory.
+
+    Each file is parsed once and re-parsed only when its (mtime_ns, size)
+    changes, so keeping the index current after an edit costs one parse.
+    Files that resolve outside the working directory are never read.
+    """
+
+    def __init__(self, working_directory):
+        super().__init__(working_directory)
+        # abs path -> ((mtime_ns, size), set of abs paths it imports)
+        self._files = {}
+
+    def _wants_file(self, name):
+        return name.endswith(".py")
+
+    def _forget(self, abs_path):
+        # Caller must hold the lock
+        self._files.pop(abs_path, None)
+
+    def update(self, abs_path):
+        """
+        Re-indexes a single file if it changed since it was last parsed.
+
+        Args:
+            abs_path (str): Absolute path of the file.
+        """
+        stale = self._stale(abs_path)
+        if stale is None:
+            return
+        real_path, signature = stale
+
+        imports = self._parse_imports(abs_path, real_path)
+        with self._lock:
+            self._files[abs_path] = (signature, imports)
+
+    def _parse_imports(self, abs_path, real_path):
+        try:
+            with open(real_path, "r") as f:
+                tree = ast.parse(f.read(), filename=abs_path)
+        except (OSError, SyntaxError, ValueError):
+            # Files that don't parse yet simply have no known imports
+            return set()
+
+        file_dir = os.path.dirname(abs_path)
+        imports = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.update(self._resolve(alias.name, file_dir))
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    # Relative imports start from the importing file's package
+                    base = file_dir
+                    for _ in range(node.level - 1):
+                        base = os.path.dirname(base)
+                    search_dirs = [base]
+                else:
+                    search_dirs = None
+                module = node.module or ""
+                imports.update(self._resolve(module, file_dir, search_dirs))
+                # "from pkg import module" may import a submodule
+                for alias in node.names:
+                    name = f"{module}.{alias.name}" if module else alias.name
+                    imports.update(self._resolve(name, file_dir, search_dirs))
+        return imports
+
+    def _resolve(self, module, file_dir, search_dirs=None):
+        """
+        Maps a module name to the files inside the working directory it refers to.
+
+        Absolute imports are looked up next to the importing script (as Python
+        does for sys.path[0]) and at the working directory root.
+        """
+        if search_dirs is None:
+            search_dirs = [file_dir, self.root]
+        parts = [part for part in module.split(".") if part]
+        found = set()
+        for search_dir in search_dirs:
+            base = os.path.join(search_dir, *parts)
+            candidates = [base + ".py", os.path.join(base, "__init__.py")]
+            # Importing a submodule also runs its packages' __init__ files
+            for i in range(1, len(parts)):
+                candidates.append(os.path.join(search_dir, *parts[:i], "__init__.py"))
+            for candidate in candidates:
+                if os.path.isfile(candidate):
+                    found.add(os.path.abspath(candidate))
+        return found
+
+    def affected_tests(self, changed_paths):
+        """
+        Finds the test files that transitively import any of the changed files.
+
+        Args:
+            changed_paths (iterable[str]): Absolute paths of changed files.
+
+        Returns:
+            list[str]: Absolute paths of the affected test files, sorted.
+        """
+        with self._lock:
+            importers = {}
+            for path, (_, imports) in self._files.items():
+                for imported in imports:
+                    importers.setdefault(imported, set()).add(path)
+
+        # Walk the reverse import graph from every changed file
+        affected = set()
+        pending = [os.path.abspath(path) for path in changed_paths]
+        while pending:
+            path = pending.pop()
+            if path in affected:
+                continue
+            affected.add(path)
+            pending.extend(importers.get(path, ()))
+
+        return sorted(
+            path for path in affected if _is_test_file(path) and os.path.isfile(path)
+        )
+
+
+_indexes = WorkspaceIndexes(ImportIndex)
+
+
+def get_import_index(working_directory):
+    """Returns the (refreshed) import index for a working directory."""
+    return _indexes.get(working_directory)
+
+
+def record_write(working_directory, abs_file_path):
+    """
+    Remembers that a file was changed, and updates the import index if one exists.
+
+    Args:
+        working_directory (str): The working directory the write happened in.
+        abs_file_path (str): Absolute path of the written file.
+    """
+    root = get_workspace(working_directory).root
+    # Pending changes belong to the session that made them
+    record_change(root, abs_file_path)
+    index = _indexes.existing(root)
+    if index is not None and abs_file_path.endswith(".py"):
+        index.update(abs_file_path)
+
+
+def run_affected_tests(working_directory, changed_files=None):
+    """
+    Runs only the test files affected by the files changed in this session.
+
+    A test file passes when it exits with code 0; once all affected tests
+    pass, the session's pending changes are cleared.
+
+    Args:
+        working_directory (str): The base directory where execution is allowed.
+        changed_files (list[str], optional): Paths relative to the working
+            directory to treat as changed, instead of the files written so far.
+
+    Returns:
+        str: The output of each affected test file, or a message explaining
+             why no tests were run.
+    """
+    workspace = get_workspace(working_directory)
+    root = workspace.root
+    if changed_files:
+        # Paths outside the working directory cannot affect its tests
+        changed = {workspace.resolve(path) for path in changed_files} - {None}
+    else:
+        changed = pending_changes(root)
+    if not changed:
+        return "No files have been changed in this session, so no tests are affected."
+
+    index = get_import_index(root)
+    tests = index.affected_tests(changed)
+    changed_list = ", ".join(sorted(os.path.relpath(path, root) for path in changed))
+    if not tests:
+        return f"No test files import the changed files ({changed_list})."
+
+    output = [f"Changed files: {changed_list}"]
+    all_passed = True
+    for test in tests:
+        rel_test = os.path.relpath(test, root)
+        result, exit_code = run_python(working_directory, rel_test)
+        if exit_code != 0:
+            all_passed = False
+        output.append(f"=== {rel_test} ===\n{result}")
+
+    # Once every affected test passes, later runs only need to cover new changes
+    if all_passed and not changed_files:
+        clear_changes(root, changed)
+
+    return "\n".join(output)
+
+
+# Define schema so the LLM knows how to call this function
+schema_run_affected_tests = types.FunctionDeclaration(
+    name="run_affected_tests",
+    description="Runs only the test files that (directly or transitively) import the files changed with write_file in this session, "
+    "instead of the whole test suite. Returns each test file's output.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "changed_files": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="Optional paths, relative to the working directory, to treat as changed instead of the files written so far.",
+            ),
+        },
+    ),
+)
@@ -0,0 +1,183 @@
+import functools
+import os
+import threading
+
+from functions.cache import path_signature
+
+# Directories that never contain project code worth indexing or describing
+SKIP_DIRS = {".git", "__pycache__", ".venv", "venv", "node_modules"}
+
+
+class WorkspaceFS:
+    """
+    The directory the tools are confined to.
+
+    Paths are resolved with os.path.realpath, so ".." segments and symlinks
+    are followed before the containment check, and containment is decided
+    with os.path.commonpath, so a sibling such as "./calculator2" is not
+    mistaken for part of "./calculator".
+    """
+
+    def __init__(self, working_directory):
+        # Resolved once; every path handed to the tools is checked against it
+        self.root = os.path.realpath(working_directory)
+
+    def contains(self, abs_path):
+        """Returns True if a resolved absolute path is the root or inside it."""
+        return os.path.commonpath([self.root, abs_path]) == self.root
+
+    def resolve(self, path):
+        """
+        Resolves a path given relative to the working directory.
+
+        Args:
+            path (str): The path the model asked for.
+
+        Returns:
+            str | None: The resolved absolute path, or None if it (or the
+                        target of a symlink along the way) is outside the
+                        working directory.
+        """
+        abs_path = os.path.realpath(os.path.join(self.root, path))
+        return abs_path if self.contains(abs_path) else None
+
+    def stat(self, abs_path):
+        """
+        Follows the symlinks in a path once and stats the file it leads to.
+
+        Args:
+            abs_path (str): An absolute path, as walked or written.
+
+        Returns:
+            tuple[str, os.stat_result] | None: The resolved path (the only one
+                that should be opened) and its stat, or None if the path is
+                missing or resolves outside the working directory.
+        """
+        real_path = os.path.realpath(abs_path)
+        if not self.contains(real_path):
+            return None
+        try:
+            return real_path, os.stat(real_path)
+        except OSError:
+            return None
+
+    def relative(self, abs_path):
+        """Returns a resolved absolute path relative to the working directory, with "/" separators."""
+        return os.path.relpath(abs_path, self.root).replace(os.sep, "/")
+
+
+@functools.lru_cache(maxsize=64)
+def _workspace_for(abs_working_directory):
+    return WorkspaceFS(abs_working_directory)
+
+
+def get_workspace(working_directory):
+    """
+    Returns the shared WorkspaceFS for a working directory.
+
+    The resolved root is cached, so the realpath of the working directory is
+    computed once rather than on every tool call.
+    """
+    # abspath is pure string work; it keeps the cache correct if the cwd changes
+    return _workspace_for(os.path.abspath(working_directory))
+
+
+class WorkspaceIndex:
+    """
+    Base class for indexes of the files in a working directory.
+
+    Files are keyed on the path they were walked under and re-indexed only
+    when their (mtime_ns, size) changes. Subclasses implement update(), which
+    re-indexes one file, and _forget(), which drops one (with the lock held);
+    _files maps each path to a tuple starting with its signature.
+    """
+
+    def __init__(self, working_directory):
+        self._workspace = get_workspace(working_directory)
+        self.root = self._workspace.root
+        self._files = {}
+        # Stat signature of every directory walked by the last full refresh
+        self._dirs = {}
+        self._lock = threading.Lock()
+
+    def _wants_dir(self, name):
+        return name not in SKIP_DIRS
+
+    def _wants_file(self, name):
+        return True
+
+    def refresh(self):
+        """Picks up new, changed and deleted files in the working directory."""
+        # Files are only added, removed or renamed by changing a directory, so
+        # while no directory changed, re-checking the known files is enough
+        if self._dirs and all(
+            path_signature(path) == signature for path, signature in self._dirs.items()
+        ):
+            with self._lock:
+                paths = list(self._files)
+            for path in paths:
+                self.update(path)
+            return
+
+        seen = set()
+        dirs = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirs[dirpath] = path_signature(dirpath)
+            dirnames[:] = [d for d in dirnames if self._wants_dir(d)]
+            for filename in filenames:
+                if self._wants_file(filename):
+                    path = os.path.join(dirpath, filename)
+                    seen.add(path)
+                    self.update(path)
+        self._dirs = dirs
+        with self._lock:
+            for path in list(self._files):
+                if path not in seen:
+                    self._forget(path)
+
+    def _stale(self, abs_path):
+        """
+        Checks whether a file must be re-indexed, forgetting it if it is gone.
+
+        Symlinks are followed once, here; only the resolved path may be opened.
+
+        Returns:
+            tuple[str, tuple] | None: The resolved path and the new (mtime_ns,
+                size) signature, or None if there is nothing to re-index.
+        """
+        found = self._workspace.stat(abs_path)
+        if found is None:
+            with self._lock:
+                self._forget(abs_path)
+            return None
+        real_path, file_stat = found
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+        with self._lock:
+            entry = self._files.get(abs_path)
+        if entry is not None and entry[0] == signature:
+            return None
+        return real_path, signature
+
+
+class WorkspaceIndexes:
+    """One index per working directory, created on first use."""
+
+    def __init__(self, index_class):
+        self._index_class = index_class
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, working_directory):
+        """Returns the (refreshed) index for a working directory."""
+        root = get_workspace(working_directory).root
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = self._index_class(root)
+        index.refresh()
+        return index
+
+    def existing(self, working_directory):
+        """Returns the index for a working directory if one was built, else None."""
+        with self._lock:
+            return self._indexes.get(get_workspace(working_directory).root)
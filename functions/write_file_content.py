@@ -1,15 +1,67 @@
 import os
+import secrets
 from google.genai import types
+from functions.cache import file_cache
+from functions.search import update_code_index
+from functions.test_impact import record_write
+from functions.workspace import get_workspace
+
+
+def _create_temp_file(abs_file_path):
+    # Like tempfile.mkstemp, but created with mode 0o666 so the kernel applies
+    # the umask to new files, as open() would
+    directory, name = os.path.split(abs_file_path)
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        except FileExistsError:
+            continue
+        return fd, temp_path
+
+
+def save_file(working_directory, abs_file_path, content, newline=None):
+    """
+    Atomically replaces a file's content and notifies the tools that depend on it.
+
+    The content is written to a temporary file in the same directory and then
+    moved over the target with os.replace, so readers never see a partial file.
+    A symlink is resolved first, so its target is replaced and the link kept.
+
+    Args:
+        working_directory (str): The working directory the file belongs to.
+        abs_file_path (str): Absolute path of the file to write.
+        content (str): The new content.
+        newline (str, optional): Passed to open(); use "" to keep line endings as-is.
+    """
+    # os.replace would swap a symlink itself for a regular file
+    abs_file_path = os.path.realpath(abs_file_path)
+    fd, temp_path = _create_temp_file(abs_file_path)
+    try:
+        with os.fdopen(fd, "w", newline=newline) as f:
+            f.write(content)
+        # Keep the permissions of the file being replaced
+        if os.path.exists(abs_file_path):
+            os.chmod(temp_path, os.stat(abs_file_path).st_mode & 0o7777)
+        os.replace(temp_path, abs_file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    # Drop cached reads of this file and listings of its directories
+    file_cache.invalidate(abs_file_path)
+    # Remember the change so only the tests it affects need to be re-run
+    record_write(working_directory, abs_file_path)
+    # Keep search results and symbol lookups current
+    update_code_index(working_directory, abs_file_path)
 
 
 def write_file(working_directory, file_path, content):
-    # Get the absolute path of the working directory
-    abs_working_dir = os.path.abspath(working_directory)
-    # Build the absolute path for the target file
-    abs_file_path = os.path.abspath(os.path.join(working_directory, file_path))
+    # Resolve the target file (following symlinks) inside the working directory
+    abs_file_path = get_workspace(working_directory).resolve(file_path)
 
     # Security check: prevent writing outside the working directory
-    if not abs_file_path.startswith(abs_working_dir):
+    if abs_file_path is None:
         return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
 
     # If the file doesn't exist, create any necessary parent directories
@@ -24,9 +76,8 @@ def write_file(working_directory, file_path, content):
         return f'Error: "{file_path}" is a directory, not a file'
 
     try:
-        # Open the file in write mode and save the provided content
-        with open(abs_file_path, "w") as f:
-            f.write(content)
+        # Save the provided content atomically
+        save_file(working_directory, abs_file_path, content)
 
         # Return a success message including how many characters were written
         return (
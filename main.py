@@ -1,120 +1,172 @@
 import sys
 import os
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv
 
-from call_function import call_function, available_functions
 from config import MAX_ITERS
-from prompts import system_prompt
 
 
 def main():
-    # Load environment variables from .env file (e.g., GEMINI_API_KEY)
-    load_dotenv()
-
     # Check if verbose flag is passed
     verbose = "--verbose" in sys.argv
 
-    # Collect non-flag arguments (the user’s actual prompt)
+    # Check if the streaming (async) agent loop was requested
+    stream = "--stream" in sys.argv
+
+    # Check if model responses may be served from the on-disk response cache
+    cache = "--cache" in sys.argv
+
+    # Collect non-flag arguments (the user’s actual prompt) and flags taking a value
     args = []
-    for arg in sys.argv[1:]:
-        if not arg.startswith("--"):
+    options = {"--resume": None, "--record": None, "--replay": None, "--trace": None}
+    argv = iter(sys.argv[1:])
+    for arg in argv:
+        if arg in options:
+            options[arg] = next(argv, None)
+        elif not arg.startswith("--"):
             args.append(arg)
+    resume = options["--resume"]
 
     # If no arguments provided, show usage instructions and exit
-    if not args:
+    if not args and not resume:
         print("AI Code Assistant")
-        print('\nUsage: python main.py "your prompt here" [--verbose]')
+        print('\nUsage: python main.py "your prompt here" [--verbose] [--stream]')
+        print("       python main.py --resume <session> [--verbose] [--stream]")
+        print("       [--record <file>] saves model responses, [--replay <file>] serves them offline")
+        print("       [--trace <file>] writes timing spans as JSONL and prints a summary")
+        print("       [--cache] reuses model responses to identical requests")
         print('Example: python main.py "How do I fix the calculator?"')
         sys.exit(1)
 
-    # Get the Gemini API key from environment variables
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
-
-    # Combine all user arguments into a single prompt string
-    user_prompt = " ".join(args)
-
-    # Print the user prompt if verbose mode is enabled
-    if verbose:
-        print(f"User prompt: {user_prompt}\n")
-
-    # Create the initial user message to send to the model
-    messages = [
-        types.Content(role="user", parts=[types.Part(text=user_prompt)]),
-    ]
+    # Only now that there is work to do, import the SDK, the agent loop and the
+    # tools; the usage message above never pays for them
+    from dotenv import load_dotenv
+    from google.genai import errors
+
+    from agent import run_agent
+    from context import ContextManager
+    from manifest import initial_content
+    from replay import RecordingClient, ReplayClient
+    from response_cache import CachingClient, ResponseCache
+    from session import (
+        JournaledMessages,
+        SessionJournal,
+        finish_turn,
+        load_session,
+        session_path,
+        unfinished_calls,
+    )
+    from tracing import tracer
 
-    # Control loop to prevent infinite generation cycles
-    iters = 0
-    while True:
-        iters += 1
-        if iters > MAX_ITERS:
-            print(f"Maximum iterations ({MAX_ITERS}) reached.")
-            sys.exit(1)
+    # Load environment variables from .env file (e.g., GEMINI_API_KEY)
+    load_dotenv()
 
+    if resume:
+        # Rebuild the conversation from the session's journal and keep appending to it
         try:
-            # Generate response content from the model
-            final_response = generate_content(client, messages, verbose)
-            if final_response:
-                # If a final text response is generated, print it and stop
-                print("Final response:")
-                print(final_response)
-                break
-        except Exception as e:
-            # Catch and print any errors from generate_content
-            print(f"Error in generate_content: {e}")
-
-
-def generate_content(client, messages, verbose):
-    # Call the Gemini model with the current conversation state
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=messages,
-        config=types.GenerateContentConfig(
-            tools=[available_functions],  # Functions the model can call
-            system_instruction=system_prompt,  # System-level guidance prompt
-        ),
-    )
-
-    # Print token usage details if verbose mode is enabled
-    if verbose:
-        print("Prompt tokens:", response.usage_metadata.prompt_token_count)
-        print("Response tokens:", response.usage_metadata.candidates_token_count)
-
-    # Append model candidates (possible responses) to the conversation
-    if response.candidates:
-        for candidate in response.candidates:
-            function_call_content = candidate.content
-            messages.append(function_call_content)
-
-    # If no function calls were requested, return the text response
-    if not response.function_calls:
-        return response.text
-
-    # If function calls are requested, execute them
-    function_responses = []
-    for function_call_part in response.function_calls:
-        function_call_result = call_function(function_call_part, verbose)
-        if (
-            not function_call_result.parts
-            or not function_call_result.parts[0].function_response
-        ):
-            raise Exception("empty function call result")
-
-        # Print function responses in verbose mode
+            history, pending = load_session(resume)
+        except FileNotFoundError:
+            print(f'Error: no session "{resume}" found')
+            sys.exit(1)
+        journal = SessionJournal(session_path(resume))
+        messages = JournaledMessages(history, journal)
         if verbose:
-            print(f"-> {function_call_result.parts[0].function_response.response}")
+            print(f"Resuming session {journal.session_id} ({len(history)} messages)\n")
+
+        # Finish the function calls of a turn that was interrupted
+        finish_turn(messages, pending, verbose)
 
-        # Collect the function response parts
-        function_responses.append(function_call_result.parts[0])
+        # A session that already ended with a text response has nothing left to do
+        if messages and messages[-1].role == "model" and not unfinished_calls(messages):
+            print("Final response:")
+            print("".join(part.text or "" for part in messages[-1].parts or []))
+            return
+    else:
+        # Combine all user arguments into a single prompt string
+        user_prompt = " ".join(args)
 
-    # If no valid function responses were returned, stop with an error
-    if not function_responses:
-        raise Exception("no function responses generated, exiting.")
+        # Print the user prompt if verbose mode is enabled
+        if verbose:
+            print(f"User prompt: {user_prompt}\n")
 
-    # Add the function responses back into the conversation context
-    messages.append(types.Content(role="user", parts=function_responses))
+        # Every message is journaled as it is added, so the session can be resumed
+        journal = SessionJournal.create()
+        if verbose:
+            print(f"Session: {journal.session_id}\n")
+        messages = JournaledMessages([], journal)
+
+        # Create the initial user message to send to the model, with a manifest
+        # of the working directory so the model can skip listing it first
+        messages.append(initial_content(user_prompt))
+
+    # Create the client only once the session actually needs the model
+    if options["--replay"]:
+        # Serve a recorded session's responses instead of calling the API
+        client = ReplayClient(options["--replay"])
+    else:
+        from google import genai
+
+        from scheduler import ScheduledClient
+
+        # Get the Gemini API key from environment variables
+        api_key = os.environ.get("GEMINI_API_KEY")
+        # Model calls are retried with backoff when rate limited or the server fails
+        client = ScheduledClient(genai.Client(api_key=api_key))
+    response_cache = None
+    if cache:
+        # Answer repeated requests from disk until a tool changes the workspace
+        response_cache = ResponseCache()
+        client = CachingClient(client, response_cache)
+    if options["--record"]:
+        # Capture every request/response pair for offline replay
+        client = RecordingClient(client, options["--record"])
+
+    # Time every iteration, model call and tool call when tracing
+    if options["--trace"]:
+        tracer.start(options["--trace"])
+    try:
+        with tracer.span("session", session=journal.session_id):
+            # Keeps the history within the token budget as it grows
+            context = ContextManager()
+
+            # Stream text and start function calls as soon as they arrive
+            if stream:
+                from streaming import main_streaming
+
+                try:
+                    main_streaming(client, messages, verbose, context)
+                except errors.APIError as e:
+                    print(f"Error: model call failed: {e}")
+                    print(f"Resume with: python main.py --resume {journal.session_id}")
+                    sys.exit(1)
+                finally:
+                    journal.close()
+                return
+
+            # Run the agent loop until the model gives its final answer
+            try:
+                final_response = run_agent(client, messages, verbose, context)
+            except errors.APIError as e:
+                print(f"Error: model call failed: {e}")
+                print(f"Resume with: python main.py --resume {journal.session_id}")
+                sys.exit(1)
+            finally:
+                journal.close()
+            if final_response is None:
+                print(f"Maximum iterations ({MAX_ITERS}) reached.")
+                print(f"Resume with: python main.py --resume {journal.session_id}")
+                sys.exit(1)
+
+            # Report how many model calls the response cache saved
+            if verbose and response_cache:
+                print(response_cache.stats())
+
+            # If a final text response is generated, print it and stop
+            print("Final response:")
+            print(final_response)
+    finally:
+        if tracer.enabled:
+            print()
+            print(tracer.summary())
+            tracer.stop()
 
 
 if __name__ == "__main__":
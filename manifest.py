@@ -0,0 +1,244 @@
+import ast
+import hashlib
+import json
+import os
+import tempfile
+
+from google.genai import types
+
+from config import MANIFEST_CACHE_DIR, MANIFEST_TOKEN_BUDGET, WORKING_DIR
+from functions.gitignore import is_ignored, read_gitignore
+from functions.workspace import SKIP_DIRS, get_workspace
+
+# Rough characters per token, used to keep the manifest within its budget
+_CHARS_PER_TOKEN = 4
+
+# Readable file types for common extensions (anything else shows its extension)
+_FILE_TYPES = {
+    ".py": "python",
+    ".md": "markdown",
+    ".txt": "text",
+    ".json": "json",
+    ".toml": "toml",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".cfg": "config",
+    ".ini": "config",
+    ".sh": "shell",
+}
+
+
+def python_symbols(source):
+    """
+    Lists the top-level classes (with their methods) and functions of a Python file.
+
+    Args:
+        source (str): The file's source code.
+
+    Returns:
+        list[tuple[str, list[str]]]: (symbol, method names) for each definition,
+                                     e.g. ("class Calculator", ["evaluate"]).
+
+    Raises:
+        SyntaxError: If the file does not parse.
+    """
+    symbols = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.ClassDef):
+            methods = [
+                child.name
+                for child in node.body
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ]
+            symbols.append((f"class {node.name}", methods))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append((f"def {node.name}", []))
+    return symbols
+
+
+def _format_size(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class _SymbolCache:
+    """
+    Remembers each Python file's symbols between runs, keyed on its mtime and
+    size, so only files changed since the last manifest are parsed again.
+    """
+
+    def __init__(self, abs_root, directory):
+        name = hashlib.sha1(abs_root.encode("utf-8")).hexdigest()
+        self.path = os.path.join(directory, f"{name}.json") if directory else None
+        self._entries = {}
+        self._used = {}
+        if self.path:
+            try:
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def symbols(self, abs_path, rel_path, st):
+        entry = self._entries.get(rel_path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            symbols = entry[2]
+        else:
+            try:
+                with open(abs_path, "r", encoding="utf-8") as f:
+                    # Stored as lists, the form they come back from JSON in
+                    symbols = [list(symbol) for symbol in python_symbols(f.read())]
+            except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+                symbols = None
+        self._used[rel_path] = [st.st_mtime_ns, st.st_size, symbols]
+        return symbols
+
+    def save(self):
+        # Only keep files that still exist, and skip the write if nothing changed
+        if not self.path or self._used == self._entries:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._used, f)
+        os.replace(temp_path, self.path)
+
+
+def _scan(workspace, symbol_cache):
+    """
+    Walks the working directory, honouring .gitignore files. Symlinks that
+    resolve outside the working directory are left out, unread.
+
+    Returns:
+        list[tuple]: (rel_path, depth, is_dir, size, file type, symbols) per entry, sorted by path.
+    """
+    entries = []
+    abs_root = workspace.root
+    pending = [(abs_root, "", 0, read_gitignore(abs_root, ""))]
+    while pending:
+        abs_dir, rel_dir, depth, rules = pending.pop()
+        if rel_dir:
+            rules = rules + read_gitignore(abs_dir, rel_dir)
+        try:
+            with os.scandir(abs_dir) as it:
+                dir_entries = list(it)
+        except OSError:
+            continue
+
+        for entry in dir_entries:
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and entry.name in SKIP_DIRS:
+                continue
+            if is_ignored(rules, rel_path, is_dir):
+                continue
+            if is_dir:
+                entries.append((rel_path, depth, True, 0, None, None))
+                pending.append((entry.path, rel_path, depth + 1, rules))
+                continue
+
+            # Only the resolved path of a symlink is stat'ed and parsed
+            found = workspace.stat(entry.path)
+            if found is None:
+                continue
+            abs_path, st = found
+            extension = os.path.splitext(entry.name)[1].lower()
+            file_type = _FILE_TYPES.get(extension, extension.lstrip(".") or "file")
+            symbols = None
+            if extension == ".py":
+                symbols = symbol_cache.symbols(abs_path, rel_path, st)
+            entries.append((rel_path, depth, False, st.st_size, file_type, symbols))
+
+    # Sort by path components, so every directory is directly followed by its contents
+    entries.sort(key=lambda entry: entry[0].split("/"))
+    return entries
+
+
+def _format(entries, detail):
+    # detail 2: symbols with methods, 1: symbols only, 0: just the tree
+    lines = []
+    for rel_path, depth, is_dir, size, file_type, symbols in entries:
+        name = rel_path.rsplit("/", 1)[-1]
+        indent = "  " * depth
+        if is_dir:
+            lines.append(f"{indent}{name}/")
+            continue
+        line = f"{indent}{name} ({_format_size(size)}, {file_type})"
+        if symbols and detail:
+            described = [
+                f"{symbol} [{', '.join(methods)}]" if methods and detail > 1 else symbol
+                for symbol, methods in symbols
+            ]
+            line += ": " + "; ".join(described)
+        lines.append(line)
+    return lines
+
+
+def build_manifest(
+    working_directory=WORKING_DIR,
+    token_budget=MANIFEST_TOKEN_BUDGET,
+    cache_dir=MANIFEST_CACHE_DIR,
+):
+    """
+    Describes the working directory as a compact tree with sizes, file types
+    and the top-level symbols of each Python file.
+
+    Detail is dropped (first method names, then symbols, then entries at the
+    end of the tree) until the manifest fits its token budget.
+
+    Args:
+        working_directory (str): The directory to describe.
+        token_budget (int): Estimated maximum size of the manifest in tokens.
+        cache_dir (str | None): Where parsed symbols are cached between runs.
+
+    Returns:
+        str: The manifest.
+    """
+    workspace = get_workspace(working_directory)
+    symbol_cache = _SymbolCache(workspace.root, cache_dir)
+    entries = _scan(workspace, symbol_cache)
+    symbol_cache.save()
+
+    header = "Workspace manifest (paths relative to the working directory):"
+    char_budget = token_budget * _CHARS_PER_TOKEN - len(header) - 1
+    for detail in (2, 1, 0):
+        lines = _format(entries, detail)
+        if sum(len(line) + 1 for line in lines) <= char_budget:
+            return "\n".join([header] + lines)
+
+    # Even the bare tree is too big: keep its beginning and say what was left out
+    kept = []
+    used = 0
+    for line in lines:
+        if used + len(line) + 1 > char_budget - 80:
+            break
+        kept.append(line)
+        used += len(line) + 1
+    kept.append(
+        f"[... {len(lines) - len(kept)} more entries; list them with get_files_info]"
+    )
+    return "\n".join([header] + kept)
+
+
+def initial_content(user_prompt, working_directory=WORKING_DIR):
+    """
+    Builds the first user message: the prompt followed by the workspace manifest,
+    so the model does not need a turn just to look around.
+
+    Args:
+        user_prompt (str): The user's request.
+        working_directory (str): The directory the tools operate in.
+
+    Returns:
+        types.Content: The initial user message.
+    """
+    parts = [types.Part(text=user_prompt)]
+    try:
+        parts.append(types.Part(text=build_manifest(working_directory)))
+    except OSError:
+        # Without a manifest the model can still list the directory itself
+        pass
+    return types.Content(role="user", parts=parts)
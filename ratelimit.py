@@ -0,0 +1,61 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    A thread-safe token bucket allowing `rate` units per `period` seconds.
+
+    The bucket starts full, so short bursts up to `rate` go through at once;
+    after that, callers block until enough capacity has been refilled.
+    """
+
+    def __init__(self, rate, period=60.0):
+        self.rate = rate
+        self.period = period
+        self._available = float(rate)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        # Caller must hold the lock
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._available = min(
+            self.rate, self._available + elapsed * self.rate / self.period
+        )
+
+    def acquire(self, amount=1):
+        """
+        Blocks until `amount` units are available, then consumes them.
+
+        Args:
+            amount (float): How many units to take. Amounts larger than the
+                            bucket wait for a full bucket and drive it negative.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.rate)
+                if self._available >= needed:
+                    self._available -= amount
+                    return waited
+                delay = (needed - self._available) * self.period / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def charge(self, amount):
+        """
+        Takes (or, if negative, returns) units without waiting.
+
+        Used to settle the difference once the real cost of a request is known;
+        a debt simply makes the next acquire wait longer.
+        """
+        with self._lock:
+            self._refill()
+            self._available = min(self.rate, self._available - amount)
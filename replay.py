@@ -0,0 +1,236 @@
+import json
+import threading
+
+from google.genai import types
+
+
+class ReplayError(Exception):
+    """Raised when a replayed session asks for something that was not recorded."""
+
+
+def _dump_request(kwargs):
+    # Keep what identifies the request; the config (tools, system prompt) is
+    # the same for every call of a session
+    return {
+        "model": kwargs.get("model"),
+        "contents": [
+            content.model_dump(mode="json", exclude_none=True)
+            for content in kwargs.get("contents") or []
+        ],
+    }
+
+
+def merge_chunks(chunks):
+    """
+    Joins the chunks of a streamed response into one response.
+
+    Adjacent text parts are concatenated and the last reported usage is kept,
+    so a streamed turn is recorded exactly like a non-streamed one.
+
+    Args:
+        chunks (list[types.GenerateContentResponse]): The streamed chunks.
+
+    Returns:
+        types.GenerateContentResponse: The whole response.
+    """
+    parts = []
+    usage_metadata = None
+    for chunk in chunks:
+        if chunk.usage_metadata:
+            usage_metadata = chunk.usage_metadata
+        if not chunk.candidates or not chunk.candidates[0].content:
+            continue
+        for part in chunk.candidates[0].content.parts or []:
+            if part.text and parts and parts[-1].text is not None:
+                parts[-1] = types.Part(text=parts[-1].text + part.text)
+            else:
+                parts.append(part)
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=usage_metadata,
+    )
+
+
+class _RecordingModels:
+    def __init__(self, models, path):
+        self._models = models
+        self._file = open(path, "a", buffering=1)
+        self._lock = threading.Lock()
+
+    def generate_content(self, **kwargs):
+        # Forward the request, then record it together with the response
+        response = self._models.generate_content(**kwargs)
+        self.record(kwargs, response)
+        return response
+
+    def record(self, kwargs, response):
+        record = {
+            "request": _dump_request(kwargs),
+            "response": response.model_dump(mode="json", exclude_none=True),
+        }
+        with self._lock:
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._file.close()
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _RecordingAsyncModels:
+    def __init__(self, models, recorder):
+        self._models = models
+        self._recorder = recorder
+
+    async def generate_content_stream(self, **kwargs):
+        stream = await self._models.generate_content_stream(**kwargs)
+        return self._recorded_stream(kwargs, stream)
+
+    async def _recorded_stream(self, kwargs, stream):
+        # Pass chunks on as they arrive; record the whole turn once it is complete
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        self._recorder.record(kwargs, merge_chunks(chunks))
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class AsyncClientView:
+    """Stands in for a client's aio, with its models replaced by a wrapper."""
+
+    def __init__(self, aio, models):
+        self._aio = aio
+        self.models = models
+
+    def __getattr__(self, name):
+        return getattr(self._aio, name)
+
+
+class RecordingClient:
+    """
+    Wraps a genai.Client and appends every models.generate_content request and
+    response pair to a JSONL recording, which ReplayClient can serve back later.
+    Streamed turns (client.aio.models.generate_content_stream) are recorded as
+    one response once the stream is complete.
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        self.models = _RecordingModels(client.models, path)
+        self._aio = None
+
+    @property
+    def aio(self):
+        if self._aio is None:
+            aio = self._client.aio
+            self._aio = AsyncClientView(
+                aio, _RecordingAsyncModels(aio.models, self.models)
+            )
+        return self._aio
+
+    def close(self):
+        self.models.close()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def load_recording(path):
+    """
+    Reads a recording written by RecordingClient.
+
+    Returns:
+        list[tuple[dict, types.GenerateContentResponse]]: The (request, response) pairs, in order.
+    """
+    pairs = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            pairs.append(
+                (
+                    record["request"],
+                    types.GenerateContentResponse.model_validate(record["response"]),
+                )
+            )
+    return pairs
+
+
+class _ReplayModels:
+    def __init__(self, pairs, strict):
+        self._pairs = pairs
+        self._strict = strict
+        self._position = 0
+        self.calls = []
+
+    def generate_content(self, **kwargs):
+        # Serve the recorded responses in order, checking the request still lines up
+        self.calls.append(kwargs)
+        if self._position >= len(self._pairs):
+            raise ReplayError(
+                f"request {self._position + 1} was not recorded "
+                f"(recording has {len(self._pairs)} responses)"
+            )
+        request, response = self._pairs[self._position]
+        self._position += 1
+
+        contents = kwargs.get("contents") or []
+        if self._strict and len(contents) != len(request["contents"]):
+            raise ReplayError(
+                f"request {self._position} diverged from the recording: "
+                f"{len(contents)} messages instead of {len(request['contents'])}"
+            )
+        return response
+
+    def rewind(self):
+        self._position = 0
+        self.calls = []
+
+
+class _ReplayAsyncModels:
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content_stream(self, **kwargs):
+        # The next recorded response, served as a single-chunk stream
+        response = self._models.generate_content(**kwargs)
+        return single_chunk_stream(response)
+
+
+async def single_chunk_stream(response):
+    """Serves a whole response as a stream of one chunk."""
+    yield response
+
+
+class _ReplayAsyncClient:
+    # client.aio of a ReplayClient; shares its position in the recording
+    def __init__(self, models):
+        self.models = _ReplayAsyncModels(models)
+
+
+class ReplayClient:
+    """
+    A stand-in for genai.Client that serves a recorded session's responses
+    from models.generate_content (or, as single-chunk streams, from
+    aio.models.generate_content_stream), in order, without any network access.
+
+    With strict=True (the default), each request must have as many messages
+    as the recorded one, so a run that takes a different path fails loudly
+    instead of being fed responses meant for another conversation.
+    """
+
+    def __init__(self, path=None, pairs=None, strict=True):
+        if pairs is None:
+            pairs = load_recording(path)
+        self.models = _ReplayModels(pairs, strict)
+        self.aio = _ReplayAsyncClient(self.models)
+
+    def rewind(self):
+        """Starts serving the recording from the beginning again."""
+        self.models.rewind()
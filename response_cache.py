@@ -0,0 +1,240 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from google.genai import types
+
+from config import RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+from replay import AsyncClientView, merge_chunks, single_chunk_stream
+
+# Tools whose calls change the working directory (or depend on more than the
+# files the conversation has seen), after which a recorded answer may be wrong
+SIDE_EFFECT_TOOLS = {"write_file", "patch_file", "run_python_file", "run_affected_tests"}
+
+
+def _dump(value):
+    # Serialize SDK models and plain values alike into something json can hash
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    return value
+
+
+def request_key(kwargs):
+    """
+    Hashes everything that determines a model response.
+
+    Args:
+        kwargs (dict): The arguments of a generate_content call.
+
+    Returns:
+        str: A hex digest of the model, system instruction, tool schemas and history.
+    """
+    config = kwargs.get("config")
+    request = {
+        "model": kwargs.get("model"),
+        "system_instruction": _dump(getattr(config, "system_instruction", None)),
+        "tools": _dump(getattr(config, "tools", None)),
+        "contents": _dump(kwargs.get("contents") or []),
+    }
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def has_side_effects(contents):
+    """Returns True if any turn in the history called a tool that changes the workspace."""
+    for content in contents:
+        for part in content.parts or []:
+            if part.function_call and part.function_call.name in SIDE_EFFECT_TOOLS:
+                return True
+    return False
+
+
+class ResponseCache:
+    """
+    An on-disk cache of model responses, one JSON file per request key.
+
+    Entries older than `ttl` seconds are ignored (and removed); once the
+    directory grows past `max_bytes`, the least recently used entries are
+    evicted. Safe to share between threads and processes: entries are written
+    atomically and a lost race only costs a model call.
+    """
+
+    def __init__(
+        self,
+        directory=RESPONSE_CACHE_DIR,
+        ttl=RESPONSE_CACHE_TTL,
+        max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def count(self, outcome):
+        """Counts a lookup outcome: "hits", "misses" or "bypassed"."""
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached response for a key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r") as f:
+                response = types.GenerateContentResponse.model_validate_json(f.read())
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction removes the least recently used first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return response
+
+    def put(self, key, response):
+        """Stores a response, then evicts old entries if the cache is over its size."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(response.model_dump_json(exclude_none=True))
+        os.replace(temp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.max_bytes:
+                return
+            now = time.time()
+            for mtime, size, path in sorted(entries):
+                # Expired entries go first, then the least recently used ones
+                if total <= self.max_bytes and now - mtime <= self.ttl:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+    def stats(self):
+        return f"Response cache: {self.hits} hits, {self.misses} misses, {self.bypassed} bypassed"
+
+
+class _CachingModels:
+    def __init__(self, models, cache):
+        self._models = models
+        self._cache = cache
+
+    def generate_content(self, **kwargs):
+        contents = kwargs.get("contents") or []
+
+        # Once the workspace may have changed, only the live model can answer
+        if has_side_effects(contents):
+            self._cache.count("bypassed")
+            return self._models.generate_content(**kwargs)
+
+        key = request_key(kwargs)
+        response = self._cache.get(key)
+        if response is not None:
+            self._cache.count("hits")
+            return response
+
+        self._cache.count("misses")
+        response = self._models.generate_content(**kwargs)
+        # Only complete answers are worth replaying
+        if response.candidates:
+            self._cache.put(key, response)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _CachingAsyncModels:
+    def __init__(self, models, cache):
+        self._models = models
+        self._cache = cache
+
+    async def generate_content_stream(self, **kwargs):
+        contents = kwargs.get("contents") or []
+
+        # Once the workspace may have changed, only the live model can answer
+        if has_side_effects(contents):
+            self._cache.count("bypassed")
+            return await self._models.generate_content_stream(**kwargs)
+
+        key = request_key(kwargs)
+        response = self._cache.get(key)
+        if response is not None:
+            self._cache.count("hits")
+            return single_chunk_stream(response)
+
+        self._cache.count("misses")
+        stream = await self._models.generate_content_stream(**kwargs)
+        return self._cached_stream(key, stream)
+
+    async def _cached_stream(self, key, stream):
+        # Pass chunks on as they arrive; cache the whole turn once it is complete
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        response = merge_chunks(chunks)
+        # Only complete answers are worth replaying
+        if response.candidates[0].content.parts:
+            self._cache.put(key, response)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class CachingClient:
+    """
+    Wraps a genai.Client so models.generate_content (and the async client's
+    models.generate_content_stream) is served from a ResponseCache when the
+    same request was answered before. Requests whose history contains a
+    side-effecting tool call always go to the model.
+    """
+
+    def __init__(self, client, cache=None):
+        self._client = client
+        self.cache = cache or ResponseCache()
+        self.models = _CachingModels(client.models, self.cache)
+        self._aio = None
+
+    @property
+    def aio(self):
+        # Wrapped on first use, so clients without an async side still work
+        if self._aio is None:
+            aio = self._client.aio
+            self._aio = AsyncClientView(
+                aio, _CachingAsyncModels(aio.models, self.cache)
+            )
+        return self._aio
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,257 @@
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+from google.genai import errors
+
+from config import (
+    MODEL_MAX_RETRIES,
+    MODEL_RETRY_BASE_DELAY,
+    MODEL_RETRY_MAX_DELAY,
+)
+from ratelimit import RateLimiter
+
+# HTTP status codes worth retrying: timeouts, rate limiting and server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    """
+    Decides whether a failed model call may succeed if retried.
+
+    Args:
+        error (Exception): The error raised by generate_content.
+
+    Returns:
+        bool: True for rate limiting, server errors and network failures;
+              False for everything else (bad requests, auth errors, bugs).
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError))
+
+
+def _retry_after(error):
+    # Honour the server's Retry-After header (in seconds) when there is one
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ModelScheduler:
+    """
+    Schedules calls to client.models.generate_content.
+
+    Every call first waits for a request slot and for enough prompt-token
+    budget, both shared by all threads using the scheduler. The token cost of a
+    request is estimated from the size of its contents, calibrated against the
+    prompt token counts the API reports. Retryable failures (429, 5xx, network
+    errors) are retried with jittered exponential backoff; anything else is
+    raised immediately.
+    """
+
+    def __init__(
+        self,
+        models,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=MODEL_MAX_RETRIES,
+        base_delay=MODEL_RETRY_BASE_DELAY,
+        max_delay=MODEL_RETRY_MAX_DELAY,
+        sleep=time.sleep,
+        rng=random.random,
+    ):
+        self._models = models
+        self._requests = (
+            RateLimiter(requests_per_minute) if requests_per_minute else None
+        )
+        self._tokens = RateLimiter(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Injectable so tests can run without real waiting or randomness
+        self._sleep = sleep
+        self._rng = rng
+        # Characters of serialized contents per prompt token, learned from responses
+        self._chars_per_token = 4.0
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def _estimate_tokens(self, contents):
+        size = sum(
+            len(content.model_dump_json(exclude_none=True))
+            if hasattr(content, "model_dump_json")
+            else len(str(content))
+            for content in contents
+        )
+        with self._lock:
+            return int(size / self._chars_per_token) + 1, size
+
+    def _observe(self, size, response):
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        if prompt_tokens:
+            with self._lock:
+                self._chars_per_token = max(1.0, size / prompt_tokens)
+        return prompt_tokens
+
+    def backoff_delay(self, attempt, error=None):
+        """
+        Returns how long to wait before retry number `attempt` (starting at 0).
+
+        Uses "full jitter": a random delay between zero and the exponential
+        backoff cap, so many clients retrying at once spread out.
+        """
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        cap = min(self.max_delay, self.base_delay * (2**attempt))
+        return cap * self._rng()
+
+    def _wait_for_capacity(self, estimated_tokens):
+        # Blocks until both a request slot and the prompt-token budget are free
+        if self._requests:
+            self._requests.acquire()
+        if self._tokens:
+            self._tokens.acquire(estimated_tokens)
+
+    def _retry_delay(self, error, attempt, estimated_tokens):
+        # A failed request consumed no prompt tokens
+        if self._tokens:
+            self._tokens.charge(-estimated_tokens)
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return None
+        self.retries += 1
+        return self.backoff_delay(attempt, error)
+
+    def _settle(self, prompt_tokens, estimated_tokens):
+        # Charge (or refund) the difference between estimated and actual tokens
+        if self._tokens and prompt_tokens:
+            self._tokens.charge(prompt_tokens - estimated_tokens)
+
+    def generate_content(self, **kwargs):
+        """
+        Calls generate_content within the rate limits, retrying transient failures.
+
+        Args:
+            **kwargs: Passed through to client.models.generate_content.
+
+        Returns:
+            types.GenerateContentResponse: The model response.
+
+        Raises:
+            Exception: The last error, if it is not retryable or retries ran out.
+        """
+        contents = kwargs.get("contents") or []
+        estimated_tokens, size = self._estimate_tokens(contents)
+
+        attempt = 0
+        while True:
+            self._wait_for_capacity(estimated_tokens)
+            try:
+                response = self._models.generate_content(**kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, estimated_tokens)
+                if delay is None:
+                    raise
+                attempt += 1
+                self._sleep(delay)
+                continue
+
+            self._settle(self._observe(size, response), estimated_tokens)
+            return response
+
+    async def generate_content_stream(self, models, **kwargs):
+        """
+        Opens a streamed response within the same rate limits and retries.
+
+        Only opening the stream is retried: once chunks have been handed to
+        the caller, a failure is raised from the stream as it is.
+
+        Args:
+            models: client.aio.models of the wrapped client.
+            **kwargs: Passed through to generate_content_stream.
+
+        Returns:
+            AsyncIterator[types.GenerateContentResponse]: The response chunks.
+        """
+        contents = kwargs.get("contents") or []
+        estimated_tokens, size = self._estimate_tokens(contents)
+
+        attempt = 0
+        while True:
+            # The limiters block, so wait for them off the event loop
+            await asyncio.to_thread(self._wait_for_capacity, estimated_tokens)
+            try:
+                stream = await models.generate_content_stream(**kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, estimated_tokens)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.to_thread(self._sleep, delay)
+                continue
+            return self._settled_stream(stream, size, estimated_tokens)
+
+    async def _settled_stream(self, stream, size, estimated_tokens):
+        # The prompt token count arrives with the chunks, usually the last one
+        prompt_tokens = None
+        async for chunk in stream:
+            prompt_tokens = self._observe(size, chunk) or prompt_tokens
+            yield chunk
+        self._settle(prompt_tokens, estimated_tokens)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _AsyncScheduledModels:
+    # client.aio.models, with streamed calls going through the shared scheduler
+    def __init__(self, models, scheduler):
+        self._models = models
+        self._scheduler = scheduler
+
+    async def generate_content_stream(self, **kwargs):
+        return await self._scheduler.generate_content_stream(self._models, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _AsyncScheduledClient:
+    def __init__(self, aio, scheduler):
+        self._aio = aio
+        self.models = _AsyncScheduledModels(aio.models, scheduler)
+
+    def __getattr__(self, name):
+        return getattr(self._aio, name)
+
+
+class ScheduledClient:
+    """
+    Wraps a genai.Client so models.generate_content, and the async client's
+    models.generate_content_stream, go through one shared ModelScheduler.
+    Everything else is passed through.
+    """
+
+    def __init__(self, client, **scheduler_options):
+        self._client = client
+        self.models = ModelScheduler(client.models, **scheduler_options)
+        self._aio = None
+
+    @property
+    def aio(self):
+        # Wrapped on first use, so clients without an async side still work
+        if self._aio is None:
+            self._aio = _AsyncScheduledClient(self._client.aio, self.models)
+        return self._aio
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
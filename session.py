@@ -0,0 +1,171 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+from google.genai import types
+
+from config import SESSION_DIR, WORKING_DIR
+from dispatch import call_functions
+
+
+class SessionJournal:
+    """
+    An append-only JSONL journal of an agent session.
+
+    Every message added to the conversation is written as soon as it exists,
+    and so is every function result as soon as its call finishes, so a session
+    that dies mid-turn can be resumed without repeating completed work.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.session_id = os.path.splitext(os.path.basename(path))[0]
+        # Line buffered, so each record reaches the OS as soon as it is written
+        self._file = open(path, "a", buffering=1)
+        # Function results are recorded from the dispatcher's worker threads
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(cls, directory=SESSION_DIR):
+        """Starts a journal for a new session in the given directory."""
+        os.makedirs(directory, exist_ok=True)
+        session_id = time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:8]
+        return cls(os.path.join(directory, f"{session_id}.jsonl"))
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def record_content(self, content):
+        """Appends a message of the conversation."""
+        self._write(
+            {"type": "content", "content": content.model_dump(mode="json", exclude_none=True)}
+        )
+
+    def record_function_result(self, index, function_call_result):
+        """
+        Appends the result of one function call of the current turn.
+
+        Args:
+            index (int): Position of the call in the model's list of function calls.
+            function_call_result (types.Content): The result returned by call_function.
+        """
+        if not function_call_result.parts:
+            return
+        part = function_call_result.parts[0]
+        self._write(
+            {
+                "type": "function_result",
+                "index": index,
+                "part": part.model_dump(mode="json", exclude_none=True),
+            }
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class JournaledMessages(list):
+    """A conversation history that records every appended message in a journal."""
+
+    def __init__(self, messages, journal):
+        super().__init__(messages)
+        self.journal = journal
+
+    def append(self, content):
+        super().append(content)
+        self.journal.record_content(content)
+
+
+def session_path(session, directory=SESSION_DIR):
+    """Resolves a session id (or a path to a journal file) to the journal's path."""
+    if os.path.isfile(session):
+        return session
+    return os.path.join(directory, f"{session}.jsonl")
+
+
+def load_session(session, directory=SESSION_DIR):
+    """
+    Rebuilds a session's conversation from its journal.
+
+    Args:
+        session (str): The session id, or the path to its journal file.
+        directory (str): Where session journals are stored.
+
+    Returns:
+        tuple: (messages, pending), where messages is the list of types.Content
+               and pending maps call index -> function response part for calls
+               of an unfinished last turn that had already completed.
+
+    Raises:
+        FileNotFoundError: If there is no journal for the session.
+    """
+    messages = []
+    pending = {}
+    with open(session_path(session, directory), "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a half-written last line behind
+                break
+            if record["type"] == "content":
+                messages.append(types.Content.model_validate(record["content"]))
+                pending = {}
+            elif record["type"] == "function_result":
+                pending[record["index"]] = types.Part.model_validate(record["part"])
+    return messages, pending
+
+
+def unfinished_calls(messages):
+    """
+    Returns the function calls of the last model turn if their results were never added.
+
+    Returns:
+        list[types.FunctionCall]: The calls, or an empty list if the last turn is complete.
+    """
+    if not messages or messages[-1].role != "model":
+        return []
+    return [part.function_call for part in messages[-1].parts or [] if part.function_call]
+
+
+def finish_turn(messages, pending, verbose=False, working_directory=WORKING_DIR):
+    """
+    Completes a turn that was interrupted while its function calls were running.
+
+    Results already recorded in the journal are reused; only the calls that
+    never finished are run again. The function responses are then appended
+    to messages, so the agent loop can continue from there.
+
+    Args:
+        messages (JournaledMessages): The resumed conversation.
+        pending (dict): Recorded function response parts, by call index.
+        verbose (bool): Whether to print detailed logs.
+        working_directory (str): The directory the functions operate in.
+    """
+    calls = unfinished_calls(messages)
+    if not calls:
+        return
+    missing = [index for index in range(len(calls)) if index not in pending]
+
+    def record(position, result):
+        # Map the position among the re-run calls back to the original index
+        messages.journal.record_function_result(missing[position], result)
+
+    if verbose:
+        print(f"Reusing {len(pending)} recorded results, re-running {len(missing)} calls")
+    results = call_functions(
+        [calls[index] for index in missing], verbose, working_directory, record
+    )
+    for index, result in zip(missing, results):
+        pending[index] = result.parts[0]
+
+    messages.append(
+        types.Content(role="user", parts=[pending[index] for index in range(len(calls))])
+    )
@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Directory main.py lives in; every measurement runs from here
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# What is measured: name -> (command line, what it shows)
+SCENARIOS = {
+    "usage": (
+        [sys.executable, "main.py"],
+        "printing the usage message (no SDK or tools imported)",
+    ),
+    "import_main": (
+        [sys.executable, "-c", "import main"],
+        "importing the CLI entry point",
+    ),
+    "import_agent": (
+        [sys.executable, "-c", "import agent"],
+        "importing the agent loop (SDK, dispatcher)",
+    ),
+    "schemas": (
+        [
+            sys.executable,
+            "-c",
+            "import agent; agent.generate_content_config()",
+        ],
+        "everything a first model call needs, including every tool schema",
+    ),
+}
+
+
+def time_command(command, runs):
+    """
+    Runs a command repeatedly and measures its wall-clock time.
+
+    Returns:
+        list[float]: Seconds per run.
+    """
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            command,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def import_breakdown(command, top=10):
+    """
+    Runs a command under `python -X importtime` and parses the report.
+
+    Args:
+        command (list[str]): The command (its first element must be the interpreter).
+        top (int): How many modules to return.
+
+    Returns:
+        list[tuple[str, float, float]]: (module, self ms, cumulative ms) of the
+                                        modules with the largest cumulative time
+                                        among those imported directly by our code.
+    """
+    result = subprocess.run(
+        [command[0], "-X", "importtime", *command[1:]],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        # The depth of a module is the indentation of its name
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            modules.append(
+                (name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000)
+            )
+    modules.sort(key=lambda module: -module[2])
+    return modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure how long the CLI takes to start, and which imports it pays for."
+    )
+    parser.add_argument(
+        "--runs", type=int, default=10, help="runs per scenario (default: 10)"
+    )
+    parser.add_argument(
+        "--top", type=int, default=10, help="imports to list per scenario (default: 10)"
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument(
+        "--max-usage-ms",
+        type=float,
+        help="fail if printing the usage message takes longer than this (median)",
+    )
+    options = parser.parse_args()
+
+    results = {}
+    for name, (command, description) in SCENARIOS.items():
+        samples = time_command(command, options.runs)
+        results[name] = {
+            "description": description,
+            "median_ms": round(statistics.median(samples) * 1000, 1),
+            "min_ms": round(min(samples) * 1000, 1),
+            "imports": [
+                {"module": module, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+                for module, self_ms, cumulative_ms in import_breakdown(
+                    command, options.top
+                )
+            ],
+        }
+
+    if options.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            print(
+                f"{name}: median {result['median_ms']} ms, min {result['min_ms']} ms "
+                f"- {result['description']}"
+            )
+            for module in result["imports"]:
+                print(
+                    f"    {module['cumulative_ms']:>8.1f} ms  {module['module']}"
+                    f" (self {module['self_ms']:.1f} ms)"
+                )
+
+    # Let CI fail when the usage path starts importing heavy modules again
+    if options.max_usage_ms is not None:
+        if results["usage"]["median_ms"] > options.max_usage_ms:
+            print(
+                f"Startup regression: usage took {results['usage']['median_ms']} ms "
+                f"(limit {options.max_usage_ms} ms)",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
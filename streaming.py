@@ -0,0 +1,180 @@
+import asyncio
+import sys
+
+from google.genai import errors, types
+
+from agent import generate_content_config
+from config import MAX_ITERS, MODEL
+from dispatch import FunctionCallDispatcher, result_reporter
+from functions.cache import file_cache
+from functions.changes import session_changes
+from tracing import tracer
+
+
+async def run_agent_streaming(client, messages, verbose=False, context=None):
+    """
+    Runs the agent loop on the async client, streaming model output.
+
+    Args:
+        client (genai.Client): The Gemini client.
+        messages (list[types.Content]): The conversation so far; updated in place.
+        verbose (bool): Whether to print detailed logs.
+        context (ContextManager, optional): Keeps the history within its token budget.
+
+    Returns:
+        str | None: The final text response, or None if MAX_ITERS was reached.
+
+    Raises:
+        errors.APIError: If a model call failed in a way retrying won't fix
+                         (or the scheduler already ran out of retries).
+    """
+    # Files this session writes are tracked apart from any other session's
+    with session_changes():
+        for iteration in range(MAX_ITERS):
+            try:
+                with tracer.span("iteration", iteration=iteration):
+                    final_response = await generate_content_streaming(
+                        client, messages, verbose, context
+                    )
+                if final_response is not None:
+                    return final_response
+            except errors.APIError:
+                # Looping again would only spend iterations on the same failure
+                raise
+            except Exception as e:
+                # Catch and print any errors, then let the model try again
+                print(f"Error in generate_content: {e}")
+    return None
+
+
+async def generate_content_streaming(client, messages, verbose, context=None):
+    """
+    Streams one model turn, printing text as it arrives and starting each
+    function call as soon as its part has been received.
+
+    Args:
+        client (genai.Client): The Gemini client.
+        messages (list[types.Content]): The conversation so far; updated in place.
+        verbose (bool): Whether to print detailed logs.
+        context (ContextManager, optional): Keeps the history within its token budget.
+
+    Returns:
+        str | None: The text response if the model requested no function
+                    calls, otherwise None.
+    """
+    # Compact stale tool results if the history has outgrown its token budget
+    if context:
+        context.fit(messages, verbose)
+
+    # Time until the stream is open (the rest of the turn overlaps with tool calls)
+    with tracer.span("generate_content", model=MODEL, messages=len(messages), stream=True):
+        stream = await client.aio.models.generate_content_stream(
+            model=MODEL,
+            contents=messages,
+            config=generate_content_config(),
+        )
+
+    # Parts of the model turn, rebuilt from the streamed chunks
+    model_parts = []
+    text_chunks = []
+    pending_calls = []
+    futures = []
+    usage_metadata = None
+    # Whether streamed text has been printed without a trailing newline yet
+    line_open = False
+
+    with FunctionCallDispatcher(verbose) as dispatcher:
+        async for chunk in stream:
+            if chunk.usage_metadata:
+                usage_metadata = chunk.usage_metadata
+            if not chunk.candidates or not chunk.candidates[0].content:
+                continue
+
+            for part in chunk.candidates[0].content.parts or []:
+                if part.text:
+                    # Surface text immediately and merge it into a single part
+                    print(part.text, end="", flush=True)
+                    line_open = True
+                    text_chunks.append(part.text)
+                    if model_parts and model_parts[-1].text is not None:
+                        model_parts[-1] = types.Part(
+                            text=model_parts[-1].text + part.text
+                        )
+                    else:
+                        model_parts.append(types.Part(text=part.text))
+                elif part.function_call:
+                    if line_open:
+                        print()
+                        line_open = False
+                    # Function call parts arrive complete, so start them right away
+                    model_parts.append(part)
+                    future = dispatcher.submit(part.function_call)
+                    futures.append(future)
+                    pending_calls.append(asyncio.wrap_future(future))
+                else:
+                    model_parts.append(part)
+
+        if line_open:
+            print()
+
+        # Calibrate the local token estimator against the reported prompt size
+        if context:
+            context.observe(messages, usage_metadata)
+
+        # Print token usage details if verbose mode is enabled
+        if verbose and usage_metadata:
+            print("Prompt tokens:", usage_metadata.prompt_token_count)
+            print("Response tokens:", usage_metadata.candidates_token_count)
+
+        # Append the reassembled model turn to the conversation
+        if model_parts:
+            messages.append(types.Content(role="model", parts=model_parts))
+
+        # Journal each function result once the turn that requested it is recorded
+        # (callbacks on calls that already finished run straight away)
+        journal = getattr(messages, "journal", None)
+        if journal:
+            for index, future in enumerate(futures):
+                future.add_done_callback(
+                    result_reporter(index, journal.record_function_result)
+                )
+
+        # If no function calls were requested, return the text response
+        if not pending_calls:
+            return "".join(text_chunks)
+
+        # Wait for the function calls, keeping the order they were requested in
+        function_call_results = await asyncio.gather(*pending_calls)
+
+    function_responses = []
+    for function_call_result in function_call_results:
+        if (
+            not function_call_result.parts
+            or not function_call_result.parts[0].function_response
+        ):
+            raise Exception("empty function call result")
+
+        # Print function responses in verbose mode
+        if verbose:
+            print(f"-> {function_call_result.parts[0].function_response.response}")
+
+        function_responses.append(function_call_result.parts[0])
+
+    # Report how many tool reads were served from the cache
+    if verbose:
+        print(file_cache.stats())
+
+    # Add the function responses back into the conversation context
+    messages.append(types.Content(role="user", parts=function_responses))
+    return None
+
+
+def main_streaming(client, messages, verbose=False, context=None):
+    """Runs the streaming agent loop to completion from synchronous code."""
+    final_response = asyncio.run(
+        run_agent_streaming(client, messages, verbose, context)
+    )
+    if final_response is None:
+        print(f"Maximum iterations ({MAX_ITERS}) reached.")
+        sys.exit(1)
+    return final_response
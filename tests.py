@@ -1,4 +1,36 @@
+import asyncio
+import contextvars
+import io
+import json
+import os
+import tempfile
+
+from google.genai import types
+
+from agent import run_agent
+from batch import run_batch
+from config import MAX_OUTPUT_BYTES
+from context import ContextManager
+from dispatch import call_functions
+from fake_client import FakeClient, api_error, function_call_response, text_response
+from functions.changes import session_changes
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.output_capture import run_captured
+from functions.patch_file import patch_file
+from functions.python_pool import PythonWorkerPool
 from functions.run_python import run_python_file
+from functions.search import find_symbol, search_code
+from functions.test_impact import run_affected_tests
+from functions.write_file_content import write_file
+from manifest import build_manifest
+from ratelimit import RateLimiter
+from replay import RecordingClient, ReplayClient
+from response_cache import CachingClient, ResponseCache
+from scheduler import ScheduledClient
+from tracing import tracer
+from streaming import run_agent_streaming
+from session import JournaledMessages, SessionJournal, finish_turn, load_session
 
 
 def test():
@@ -15,5 +47,501 @@ def test():
     print(result)
 
 
+def test_python_pool():
+    # A pooled run gives the same output and exit code as a fresh interpreter
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "script.py")
+        with open(script, "w") as f:
+            f.write("import sys\nprint('out', sys.argv[1:])\nprint('err', file=sys.stderr)\nsys.exit(3)\n")
+        commands = ["python", script, "a", "b"]
+        pool = PythonWorkerPool(size=1)
+        try:
+            pooled = pool.run(commands, cwd=directory, timeout=10, limit=10000)
+        finally:
+            pool.close()
+        direct = run_captured(commands, cwd=directory, timeout=10, limit=10000)
+        print(
+            (pooled.returncode, pooled.stdout, pooled.stderr)
+            == (direct.returncode, direct.stdout, direct.stderr),
+            pooled.returncode,
+        )
+    try:
+        PythonWorkerPool(size=0)
+    except ValueError as e:
+        print(f"Error: {e}")
+
+
+def test_output_capture():
+    # Output past the limit keeps its head and tail and counts what was dropped;
+    # with kill_on_limit, an endless writer is stopped instead of timing out
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "flood.py")
+        with open(script, "w") as f:
+            f.write(
+                "import sys\n"
+                "sys.stdout.write('HEAD' + 'x' * (3 * int(sys.argv[1])) + 'TAIL')\n"
+                "while len(sys.argv) > 2:\n"
+                "    sys.stdout.write('y' * 65536)\n"
+            )
+        result = run_captured(
+            ["python", script, str(MAX_OUTPUT_BYTES)],
+            cwd=directory,
+            timeout=10,
+            limit=MAX_OUTPUT_BYTES,
+        )
+        output = result.stdout
+        print(
+            output[:4],
+            output[-4:],
+            result.dropped == 3 * MAX_OUTPUT_BYTES + 8 - MAX_OUTPUT_BYTES,
+            f"[...{result.dropped} bytes of output dropped...]" in output,
+            result.killed,
+        )
+        result = run_captured(
+            ["python", script, "1", "forever"],
+            cwd=directory,
+            timeout=10,
+            limit=MAX_OUTPUT_BYTES,
+            kill_on_limit=True,
+        )
+        print(result.killed, result.stdout[:4], result.dropped > 0)
+
+
+def test_dispatch():
+    # Independent calls run concurrently but results keep the requested order
+    calls = [
+        types.FunctionCall(name="get_files_info", args={"directory": "pkg"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "main.py"}),
+        types.FunctionCall(name="run_python_file", args={"file_path": "tests.py"}),
+    ]
+    results = call_functions(calls)
+    print([result.parts[0].function_response.name for result in results])
+
+
+def test_scheduler():
+    # Rate limiting and server errors are retried with backoff, without
+    # spending agent iterations; bad requests fail immediately
+    delays = []
+    client = ScheduledClient(
+        FakeClient(
+            [
+                api_error(429),
+                api_error(503),
+                function_call_response([("get_files_info", {})]),
+                text_response("done"),
+            ]
+        ),
+        sleep=delays.append,
+        rng=lambda: 1.0,
+    )
+    messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+    print(run_agent(client, messages), delays)
+
+    client = ScheduledClient(FakeClient([api_error(400)]), sleep=delays.append)
+    messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+    try:
+        run_agent(client, messages)
+    except Exception as e:
+        print(f"Fatal: {e}")
+
+
+def test_batch():
+    # A full bucket lets a burst through, then callers wait for the refill
+    limiter = RateLimiter(2, period=1.0)
+    print([round(limiter.acquire(), 1) for _ in range(3)])
+
+    # Tasks sharing a working directory run in order, one at a time, so the
+    # scripted responses are consumed in task order; results keep input order
+    with tempfile.TemporaryDirectory() as directory:
+        tasks = [
+            {"id": name, "prompt": "hi", "working_directory": directory}
+            for name in ("a", "b", "c")
+        ]
+        client = FakeClient([text_response(text) for text in ("1", "2", "3")])
+        output = io.StringIO()
+        results = run_batch(client, tasks, output, concurrency=3)
+        print([(result["id"], result["response"]) for result in results])
+        print(len(output.getvalue().splitlines()))
+
+
+def test_context():
+    # Over budget, the re-read file's first result is stubbed as stale, older
+    # results are summarized, and the latest turn is kept whole
+    def read(path):
+        return types.Content(
+            role="model",
+            parts=[
+                types.Part(
+                    function_call=types.FunctionCall(
+                        name="get_file_content", args={"file_path": path}
+                    )
+                )
+            ],
+        )
+
+    def result(text):
+        return types.Content(
+            role="tool",
+            parts=[
+                types.Part.from_function_response(
+                    name="get_file_content", response={"result": text}
+                )
+            ],
+        )
+
+    messages = [
+        types.Content(role="user", parts=[types.Part(text="hi")]),
+        read("a.py"),
+        result("a" * 4000),
+        read("b.py"),
+        result("b" * 4000),
+        read("a.py"),
+        result("A" * 4000),
+    ]
+    context = ContextManager(token_budget=1500)
+    print(context.fit(messages) > 0, context.total(messages) <= 1500)
+    for message in messages[2::2]:
+        text = message.parts[0].function_response.response["result"]
+        print(len(text), text[:20].replace("\n", " "), "...", text[-40:].replace("\n", " "))
+
+
+def test_session():
+    # A turn interrupted after one of its two calls finished is resumed by
+    # re-running only the missing call, then the loop continues
+    with tempfile.TemporaryDirectory() as directory:
+        journal = SessionJournal.create(directory)
+        messages = JournaledMessages([], journal)
+        messages.append(types.Content(role="user", parts=[types.Part(text="hi")]))
+        calls = function_call_response(
+            [("get_files_info", {}), ("get_file_content", {"file_path": "main.py"})]
+        ).candidates[0].content
+        messages.append(calls)
+        journal.record_function_result(
+            0, call_functions([calls.parts[0].function_call])[0]
+        )
+        journal.close()
+
+        history, pending = load_session(journal.session_id, directory)
+        print(len(history), sorted(pending))
+        messages = JournaledMessages(history, SessionJournal(journal.path))
+        finish_turn(messages, pending)
+        client = FakeClient([text_response("done")])
+        print(run_agent(client, messages), len(load_session(journal.path)[0]))
+
+
+def test_replay():
+    # A recorded session replays offline to the same final response
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.jsonl")
+        client = RecordingClient(
+            FakeClient(
+                [function_call_response([("get_files_info", {})]), text_response("done")]
+            ),
+            path,
+        )
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        print(run_agent(client, messages))
+        client.close()
+
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        print(run_agent(ReplayClient(path), messages), len(messages))
+
+
+def test_streaming():
+    # Streamed turns are rate limited and retried by the scheduler, recorded
+    # whole, and replayed offline by either agent loop
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "session.jsonl")
+        delays = []
+        client = RecordingClient(
+            ScheduledClient(
+                FakeClient(
+                    [
+                        api_error(503),
+                        function_call_response([("get_files_info", {})]),
+                        text_response("done"),
+                    ]
+                ),
+                requests_per_minute=60,
+                sleep=delays.append,
+                rng=lambda: 1.0,
+            ),
+            path,
+        )
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        print(asyncio.run(run_agent_streaming(client, messages)), delays)
+        client.close()
+
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        print(asyncio.run(run_agent_streaming(ReplayClient(path), messages)))
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        print(run_agent(ReplayClient(path), messages), len(messages))
+
+    # A request the scheduler won't retry ends the session instead of looping
+    fake = FakeClient([api_error(400)] * 25)
+    messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+    try:
+        asyncio.run(run_agent_streaming(ScheduledClient(fake), messages))
+    except Exception as e:
+        print(f"Fatal after {len(fake.models.calls)} call: {e}")
+
+
+def test_tracing():
+    # Tool spans run on worker threads but still nest under their turn's dispatch
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.jsonl")
+        tracer.start(path)
+        client = FakeClient(
+            [
+                function_call_response(
+                    [("get_files_info", {}), ("get_file_content", {"file_path": "main.py"})]
+                ),
+                text_response("done"),
+            ]
+        )
+        messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+        run_agent(client, messages)
+        tracer.stop()
+        with open(path) as f:
+            spans = {span["span_id"]: span for span in map(json.loads, f)}
+        print(
+            sorted(
+                (span["name"], spans[span["parent_id"]]["name"] if span["parent_id"] else None)
+                for span in spans.values()
+            )
+        )
+        print(tracer.summary().splitlines()[0])
+
+
+def test_response_cache():
+    # A repeated session is answered from the cache up to its first write;
+    # after that every request goes to the model
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(os.path.join(directory, "cache"))
+        workspace = os.path.join(directory, "workspace")
+        os.makedirs(os.path.join(workspace, "src"))
+        scripts = [
+            [
+                function_call_response([("get_files_info", {"directory": "src"})]),
+                function_call_response(
+                    [("write_file", {"file_path": "out.txt", "content": "x"})]
+                ),
+                text_response("done"),
+            ],
+            # The rerun only needs the model for the turn after the write
+            [text_response("done")],
+        ]
+        for script in scripts:
+            client = CachingClient(FakeClient(script), cache)
+            messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+            print(run_agent(client, messages, working_directory=workspace))
+        print(cache.stats())
+
+        # Streamed turns are cached too, and served back as a single chunk
+        cache = ResponseCache(os.path.join(directory, "stream_cache"))
+        for script in [[text_response("streamed")], []]:
+            client = CachingClient(FakeClient(script), cache)
+            messages = [types.Content(role="user", parts=[types.Part(text="hi")])]
+            print(asyncio.run(run_agent_streaming(client, messages)))
+        print(cache.stats())
+
+
+def test_manifest():
+    # The full manifest, then one squeezed into a tiny budget
+    print(build_manifest("calculator", cache_dir=None))
+    print(build_manifest("calculator", token_budget=60, cache_dir=None))
+
+    # Symlinks out of the working directory are neither listed nor parsed
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = os.path.join(directory, "workspace")
+        os.makedirs(workspace)
+        with open(os.path.join(directory, "secret.py"), "w") as f:
+            f.write("def leaked_secret():\n    pass\n")
+        write_file(workspace, "app.py", "def main():\n    pass\n")
+        os.symlink(os.path.join(directory, "secret.py"), os.path.join(workspace, "link.py"))
+        os.symlink(os.path.join(workspace, "app.py"), os.path.join(workspace, "alias.py"))
+        print(build_manifest(workspace, cache_dir=None))
+
+
+def test_search():
+    print(find_symbol("calculator", "_apply_operator"))
+    print(search_code("calculator", r"def \w+\(self\)", regex=True, max_results=2))
+
+    # Writes are picked up by the index immediately
+    with tempfile.TemporaryDirectory() as directory:
+        write_file(directory, "shapes.py", "class Square:\n    def area(self):\n        pass\n")
+        print(find_symbol(directory, "area"))
+        write_file(directory, "shapes.py", "class Square:\n    def perimeter(self):\n        pass\n")
+        print(find_symbol(directory, "Square.perimeter"), "|", find_symbol(directory, "area"))
+        # Files added or edited behind the tools' back are found on the next search
+        os.makedirs(os.path.join(directory, "sub"))
+        with open(os.path.join(directory, "sub", "circle.py"), "w") as f:
+            f.write("class Circle:\n    pass\n")
+        with open(os.path.join(directory, "shapes.py"), "a") as f:
+            f.write("# corners: 4\n")
+        print(find_symbol(directory, "Circle"), "|", search_code(directory, "corners"))
+
+    # Files symlinked in from outside the working directory are never indexed
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = os.path.join(directory, "workspace")
+        os.makedirs(workspace)
+        with open(os.path.join(directory, "secret.py"), "w") as f:
+            f.write("def leaked_secret():\n    pass\n")
+        os.symlink(os.path.join(directory, "secret.py"), os.path.join(workspace, "link.py"))
+        print(search_code(workspace, "leaked_secret"), "|", find_symbol(workspace, "leaked_secret"))
+
+
+def test_ranged_reads():
+    # Ranges are moved onto character boundaries, and partial reads say where they are
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "text.txt"), "w", encoding="utf-8") as f:
+            f.write("a\u00e9\u20acb\n")  # bytes: a, é (2), € (3), b, newline
+        open(os.path.join(directory, "empty.txt"), "w").close()
+        # Starting inside "é" skips to "€"; ending inside "€" stops before it
+        print(repr(get_file_content(directory, "text.txt", offset=2)))
+        print(repr(get_file_content(directory, "text.txt", offset=0, length=4)))
+        print(repr(get_file_content(directory, "text.txt", offset=-2)))
+        print(repr(get_file_content(directory, "text.txt", offset=100)))
+        print(repr(get_file_content(directory, "empty.txt")))
+        print(repr(get_file_content(directory, "empty.txt", offset=5)))
+
+
+def test_files_info():
+    # Recursive listings honour .gitignore, globs and depth, and page long results
+    with tempfile.TemporaryDirectory() as directory:
+        for path in ("app.py", "notes.md", "build/out.bin", "pkg/mod.py", "pkg/deep/x.py"):
+            os.makedirs(os.path.join(directory, os.path.dirname(path)), exist_ok=True)
+            open(os.path.join(directory, path), "w").close()
+        with open(os.path.join(directory, ".gitignore"), "w") as f:
+            f.write("build/\n*.md\n")
+        print(get_files_info(directory, recursive=True))
+        print(get_files_info(directory, recursive=True, include=["*.py"], exclude=["deep"]))
+        print(get_files_info(directory, recursive=True, max_depth=1))
+
+        os.makedirs(os.path.join(directory, "many"))
+        for i in range(201):
+            open(os.path.join(directory, "many", f"f{i:03}.txt"), "w").close()
+        print(get_files_info(directory, "many").splitlines()[-1])
+        print(get_files_info(directory, "many", page=2))
+        print(get_files_info(directory, "many", page=3))
+
+
+def test_affected_tests():
+    # Only the tests importing a changed file run, pass/fail comes from the exit
+    # code (not the output), and each session only sees its own changes
+    with tempfile.TemporaryDirectory() as directory:
+        write_file(directory, "test_other.py", "print('other')\n")
+        write_file(
+            directory,
+            "test_mod.py",
+            "import mod\nprint('Process exited with code 1?', mod.value)\n",
+        )
+
+        def other_session():
+            with session_changes():
+                return run_affected_tests(directory)
+
+        with session_changes():
+            write_file(directory, "mod.py", "value = 1\n")
+            # A concurrent session (in its own context) has nothing pending
+            print(contextvars.Context().run(other_session))
+            with session_changes():
+                # A nested scope joins the enclosing session
+                print(run_affected_tests(directory))
+            # The tests passed, so the change is no longer pending
+            print(run_affected_tests(directory))
+
+
+def test_patch_file():
+    # Hunks apply at shifted offsets, line endings are kept, failures leave the
+    # file alone, and patching through a symlink keeps the link
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "code.py")
+        with open(path, "w", newline="") as f:
+            f.write("# header\r\n# moved\r\ndef f():\r\n    return 1\r\n")
+        # The hunk says line 2, but the function now starts at line 3
+        diff = "@@ -2,2 +2,2 @@\n def f():\n-    return 1\n+    return 2\n"
+        print(patch_file(directory, "code.py", diff))
+        with open(path, "rb") as f:
+            print(f.read())
+        print(patch_file(directory, "code.py", "@@ -1,1 +1,1 @@\n-missing\n+x\n"))
+        print(patch_file(directory, "code.py", "<<<<<<< SEARCH\nnot there\n=======\nx\n>>>>>>> REPLACE\n"))
+        print(patch_file(directory, "code.py", "no hunks here"))
+
+        os.symlink("code.py", os.path.join(directory, "link.py"))
+        print(patch_file(directory, "link.py", "<<<<<<< SEARCH\nreturn 2\n=======\nreturn 3\n>>>>>>> REPLACE\n"))
+        print(os.path.islink(os.path.join(directory, "link.py")), open(path).read().count("return 3"))
+
+        # Inside a hunk, lines starting with --- or +++ are edits, not file headers
+        with open(os.path.join(directory, "notes.md"), "w") as f:
+            f.write("intro\n---\nbody\n")
+        diff = "--- a/notes.md\n+++ b/notes.md\n@@ -1,3 +1,3 @@\n intro\n----\n+++counter\n body\n"
+        print(patch_file(directory, "notes.md", diff))
+        print(repr(open(os.path.join(directory, "notes.md")).read()))
+
+        # New files get the same mode open() gives them; rewrites keep theirs
+        with open(os.path.join(directory, "plain.txt"), "w"):
+            pass
+        print(write_file(directory, "new.txt", "x"))
+        os.chmod(os.path.join(directory, "notes.md"), 0o640)
+        print(write_file(directory, "notes.md", "y"))
+        print(
+            os.stat(os.path.join(directory, "new.txt")).st_mode
+            == os.stat(os.path.join(directory, "plain.txt")).st_mode,
+            oct(os.stat(os.path.join(directory, "notes.md")).st_mode & 0o777),
+        )
+
+
+def test_listing_cache():
+    # Files added or resized behind the tools' back still show up in listings
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "sub"))
+        with open(os.path.join(directory, "a.txt"), "w") as f:
+            f.write("a")
+        print(get_files_info(directory, recursive=True).count("\n"))
+        with open(os.path.join(directory, "sub", "b.txt"), "w") as f:
+            f.write("b")
+        with open(os.path.join(directory, "a.txt"), "w") as f:
+            f.write("a longer line")
+        listing = get_files_info(directory, recursive=True)
+        print("sub/b.txt" in listing, "a.txt: file_size=13 bytes" in listing)
+
+
+def test_workspace():
+    # Neither a sibling directory sharing the prefix nor a symlink may escape
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = os.path.join(directory, "calculator")
+        os.makedirs(workspace)
+        os.makedirs(os.path.join(directory, "calculator2"))
+        with open(os.path.join(directory, "calculator2", "secret.txt"), "w") as f:
+            f.write("secret")
+        os.symlink(
+            os.path.join(directory, "calculator2"), os.path.join(workspace, "link")
+        )
+        print(get_file_content(workspace, "../calculator2/secret.txt"))
+        print(get_file_content(workspace, "link/secret.txt"))
+        print(get_files_info(workspace, "link"))
+        print(write_file(workspace, "link/new.txt", "x"))
+
+
 if __name__ == "__main__":
     test()
+    test_python_pool()
+    test_output_capture()
+    test_dispatch()
+    test_scheduler()
+    test_batch()
+    test_context()
+    test_session()
+    test_replay()
+    test_streaming()
+    test_tracing()
+    test_response_cache()
+    test_manifest()
+    test_search()
+    test_ranged_reads()
+    test_files_info()
+    test_affected_tests()
+    test_patch_file()
+    test_listing_cache()
+    test_workspace()
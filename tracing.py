@@ -0,0 +1,171 @@
+import contextvars
+import itertools
+import json
+import threading
+import time
+
+# The span currently open in this thread or task; new spans become its children
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation with attributes, recorded when it ends."""
+
+    def __init__(self, tracer, name, parent, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.span_id = next(tracer._ids)
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        """Adds (or overwrites) attributes of the span."""
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    # Stands in for a span while tracing is off, so callers never need to check
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    def __init__(self, tracer, name, attributes):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+
+    def __enter__(self):
+        self._span = Span(
+            self._tracer, self._name, _current_span.get(), self._attributes
+        )
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current_span.reset(self._token)
+        span = self._span
+        span.duration = time.perf_counter() - span._started
+        # Exiting (SystemExit, KeyboardInterrupt) is not a failure of the operation
+        if isinstance(exc, Exception):
+            span.error = f"{exc_type.__name__}: {exc}"
+        self._tracer._finish(span)
+        return False
+
+
+class _NoopContext:
+    def __enter__(self):
+        return _NOOP_SPAN
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_CONTEXT = _NoopContext()
+
+
+class Tracer:
+    """
+    Records nested spans for the agent loop: iterations, model calls, tool calls
+    and script runs.
+
+    Tracing is off until start() is called; until then span() costs next to
+    nothing. Finished spans are appended to a JSONL trace file (if one was
+    given) and aggregated per operation for summary().
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._file = None
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # (span name, tool name) -> [count, total seconds, max seconds, errors]
+        self._totals = {}
+
+    def start(self, path=None):
+        """
+        Turns tracing on.
+
+        Args:
+            path (str, optional): JSONL file every finished span is appended to.
+        """
+        if path:
+            self._file = open(path, "a", buffering=1)
+        self.enabled = True
+
+    def stop(self):
+        """Turns tracing off and closes the trace file."""
+        self.enabled = False
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def span(self, name, **attributes):
+        """
+        Opens a span as a context manager yielding the Span.
+
+        Spans opened while another span is open (in the same thread or task,
+        or in a thread started with a copy of its context) become its children.
+
+        Args:
+            name (str): The operation, e.g. "generate_content".
+            **attributes: Initial attributes; more can be added with span.set().
+        """
+        if not self.enabled:
+            return _NOOP_CONTEXT
+        return _SpanContext(self, name, attributes)
+
+    def _finish(self, span):
+        key = (span.name, span.attributes.get("tool"))
+        record = {
+            "name": span.name,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start": round(span.start, 6),
+            "duration_ms": round(span.duration * 1000, 3),
+            "thread": threading.current_thread().name,
+            "attributes": span.attributes,
+        }
+        if span.error:
+            record["error"] = span.error
+
+        with self._lock:
+            totals = self._totals.setdefault(key, [0, 0.0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += span.duration
+            totals[2] = max(totals[2], span.duration)
+            totals[3] += 1 if span.error else 0
+            if self._file:
+                self._file.write(json.dumps(record, default=str) + "\n")
+
+    def summary(self):
+        """
+        Formats the time spent per operation as a table.
+
+        Returns:
+            str: One row per span name (and per tool for tool calls), slowest first.
+        """
+        with self._lock:
+            rows = sorted(self._totals.items(), key=lambda item: -item[1][1])
+        lines = [
+            f"{'operation':<36} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'errors':>6}",
+        ]
+        lines.append("-" * len(lines[0]))
+        for (name, tool), (count, total, longest, errors) in rows:
+            label = f"{name} [{tool}]" if tool else name
+            lines.append(
+                f"{label:<36} {count:>6} {total * 1000:>10.1f} "
+                f"{total * 1000 / count:>9.1f} {longest * 1000:>9.1f} {errors:>6}"
+            )
+        return "\n".join(lines)
+
+
+# Shared by the agent loop and the tools
+tracer = Tracer()